@@ -1,74 +1,142 @@
+import io
+from functools import partial
+
 import streamlit as st
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-
-## Conversion factors for unit conversions
-CONVERSION_FACTORS = {
-    "m³/s to liters/s": 1000,
-    "m³/s to ft³/s": 35.3147,
-    "gallon/s to m³/s": 0.00378541,
-    "liters to m³": 0.001,
-    "m³ to liters": 1000,
-    "m to feet": 3.28084,
-    "feet to m": 0.3048,
-    "bar to Pa": 100000,
-    "bar to psi": 14.5038,
-    "atm to Pa": 101325,
-    "psi to kPa": 6.89476,
-    "kWh to MJ": 3.6,
-    "hp to kW": 0.7457,
-    "kW to hp": 1.341,
-    "metric ton to kg": 1000,
-    "kg to metric ton": 0.001,
-    "m/s to km/h": 3.6,
-    "m/s to mph": 2.23694,
-    "CO2 kg to metric ton": 0.001,
-    "metric ton to lbs": 2204.62,
-}
-
-def convert_units(value, from_unit, to_unit):
-    conversion_key = f"{from_unit} to {to_unit}"
-    if conversion_key in CONVERSION_FACTORS:
-        return value * CONVERSION_FACTORS[conversion_key]
-    else:
-        return value  # # No conversion needed if key is not found
-
-def calculate_energy_consumption_normal(power_rating, operating_hours):
-    return power_rating * operating_hours
-
-def calculate_energy_consumption_booster(power_rating, operating_hours, pressure_boost):
-    return power_rating * operating_hours * (1 + pressure_boost / 10)
-
-def calculate_useful_energy(energy_consumption, efficiency):
-    return energy_consumption * (efficiency / 100)
-
-def calculate_co2_emissions(energy_consumption, emission_factor):
-    return energy_consumption * emission_factor
-
-def calculate_increased_operating_hours(operating_hours, leakage_rate):
-    return operating_hours * (1 + leakage_rate / 100)
+from calculations import convert_units
+from hourly import HOURS_PER_YEAR, DAYS_PER_YEAR, load_profile, calculate_hourly
+from fleet import TEXT_COLUMNS, fleet_columns
+from sensitivity import SENSITIVITY_RANGES, tornado, sobol_indices
+from operating_point import speed_study
+from lifecycle import LIFECYCLE_OUTPUTS, LifecycleProjection, decarbonization_path, escalation_path
+from profiling import StageTimer, profiling_enabled
+from scenarios import get_scenario_store
+from charts import bar_chart, line_chart
+from graph import CALCULATION_NODES, CalculationGraph
+
+## Upper bound on entries per results cache; the least recently used entries are evicted first
+CACHE_MAX_ENTRIES = 1000
+
+## Number of reruns kept for the session averages in the stage timings panel
+PROFILE_HISTORY = 100
+
+def normalize_input(value):
+    # # Round away floating point noise (e.g. from unit conversions) so equal inputs share a cache entry
+    return round(float(value), 9)
+
+# Functions building the chart frames, added to the calculation graph as nodes of their own
+def loss_frame(energy_consumption, friction_loss, mechanical_loss, construction_maintenance_emissions):
+    loss_labels = ['Energy Consumption', 'Friction Loss', 'Mechanical Loss', 'Construction & Maintenance Emissions']
+    loss_values = [energy_consumption, friction_loss, mechanical_loss, construction_maintenance_emissions]
+
+    loss_df = pd.DataFrame({
+        'Loss Type': loss_labels,
+        'Values': loss_values
+    })
+    return loss_df.set_index('Loss Type')
 
-def calculate_additional_energy_consumption(power_rating, increased_operating_hours, operating_hours):
-    return power_rating * (increased_operating_hours - operating_hours)
+def cost_frame(total_energy_cost, total_maintenance_cost):
+    cost_labels = ['Energy Cost', 'Maintenance Cost']
+    cost_values = [total_energy_cost, total_maintenance_cost]
 
-def calculate_friction_loss(pipe_length, pipe_diameter, flow_velocity):
-    f = 0.02  # # Assumed friction factor
-    g = 9.81  # # Gravitational acceleration (m/s²)
-    friction_loss = f * (pipe_length / pipe_diameter) * (flow_velocity ** 2) / (2 * g)
-    return friction_loss
+    cost_df = pd.DataFrame({
+        'Cost Type': cost_labels,
+        'Values': cost_values
+    })
+    return cost_df.set_index('Cost Type')
+
+APP_NODES = dict(
+    CALCULATION_NODES,
+    loss_frame=(loss_frame, ("energy_consumption", "friction_loss", "mechanical_loss", "construction_maintenance_emissions")),
+    cost_frame=(cost_frame, ("total_energy_cost", "total_maintenance_cost")),
+)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_node(name, *values):
+    # # Shared by all sessions: identical inputs in another session or a new tab reuse the result
+    function, _ = APP_NODES[name]
+    return function(*values)
+
+SHARED_NODES = {name: (partial(cached_node, name), dependencies) for name, (_, dependencies) in APP_NODES.items()}
+
+def session_graph():
+    # # One graph per session: a rerun only recalculates the results downstream of the inputs that changed,
+    # # and those come from the cross-session cache when any session already had the same values
+    if "calculation_graph" not in st.session_state:
+        st.session_state["calculation_graph"] = CalculationGraph(SHARED_NODES)
+    return st.session_state["calculation_graph"]
+
+SENSITIVITY_OUTPUTS = {
+    "total_co2_emissions": "Total CO2 Emissions (metric tons/day)",
+    "total_cost": "Total Annual Cost (currency units)",
+    "energy_consumption": "Energy Consumption (kWh/day)",
+    "friction_loss": "Friction Loss (m)",
+}
 
-def calculate_head_loss(static_head, dynamic_head):
-    return static_head + dynamic_head
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_sensitivity(inputs, output, variation):
+    # # Vary each input by a share of its sidebar range around the current value
+    ranges = {}
+    for name, (low, high) in SENSITIVITY_RANGES.items():
+        if name == "pressure_boost" and inputs["pump_type"] != "Booster Pump":
+            continue
+        spread = (high - low) * variation / 100
+        ranges[name] = (max(low, inputs[name] - spread), min(high, inputs[name] + spread))
+    return tornado(inputs, ranges, output), sobol_indices(inputs, ranges, output, n_samples=4096, seed=0)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_speed_study(pump, speed_ratios):
+    study = speed_study(pd.DataFrame([pump]), speed_ratios)
+    return study.set_index("speed_ratio")
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_lifecycle(pump, horizon, grid_reduction, price_escalation):
+    projection = LifecycleProjection(pump, horizon, grid_factor=decarbonization_path(horizon, grid_reduction),
+                                     energy_price=escalation_path(horizon, price_escalation), outputs=LIFECYCLE_OUTPUTS)
+    return projection.pump(0)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_uploaded_profile(data, name):
+    buffer = io.BytesIO(data)
+    buffer.name = name
+    return load_profile(buffer)
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def cached_hourly_summary(pump_type, power_rating, operating_hours, pressure_boost, efficiency, leakage_rate, intensity, tariff):
+    pump = {"pump_type": pump_type, "power_rating": power_rating, "operating_hours": operating_hours,
+            "pressure_boost": pressure_boost, "efficiency": efficiency, "leakage_rate": leakage_rate}
+    hourly = calculate_hourly(pump, intensity, tariff)
+    daily_df = pd.DataFrame({
+        'CO2 Emissions (metric tons/day)': hourly["co2"][0].reshape(DAYS_PER_YEAR, -1).sum(axis=1),
+        'Energy Cost (currency/day)': hourly["cost"][0].reshape(DAYS_PER_YEAR, -1).sum(axis=1),
+    })
+    daily_df.index.name = 'Day of Year'
+    hourly_df = pd.DataFrame({
+        'CO2 Emissions (metric tons/hour)': hourly["co2"][0],
+        'Energy Cost (currency/hour)': hourly["cost"][0],
+    })
+    hourly_df.index.name = 'Hour of Year'
+    return daily_df, hourly_df, hourly["co2"].sum(), hourly["cost"].sum()
 
-def calculate_mechanical_loss(input_power, mechanical_efficiency):
-    return input_power * (1 - mechanical_efficiency / 100)
+def show_stage_timings(timer):
+    history = st.session_state.setdefault("stage_timings", [])
+    history.append(dict(timer.timings))
+    del history[:-PROFILE_HISTORY]
 
-def calculate_construction_maintenance_emissions(construction_emissions, maintenance_emissions, pipeline_age):
-    return construction_emissions + (maintenance_emissions * pipeline_age)
+    timings_df = pd.DataFrame({
+        "Last Rerun (ms)": pd.Series(timer.timings) * 1000,
+        "Session Mean (ms)": pd.DataFrame(history).mean() * 1000,
+    })
+    timings_df.index.name = "Stage"
+    with st.sidebar.expander("Debug: Stage Timings", expanded=True):
+        st.dataframe(timings_df.round(2))
+        st.markdown(f"Total: {timer.total() * 1000:.1f} ms (mean of last {len(history)} reruns shown)")
+    timer.log()
 
 def main():
     st.set_page_config(layout="wide", page_title="Pump Carbon Emission Calculator")
+    timer = StageTimer(profiling_enabled(st.query_params))
     st.title("Pump Carbon Emission Calculator")
 
     pump_type = st.sidebar.selectbox("Select Pump Type", ["Water Distribution Pumps", "Booster Pump"], 
@@ -197,7 +265,7 @@ def main():
 
     ## Friction Loss Coefficient
     friction_loss_coefficient = st.sidebar.number_input("Friction Loss Coefficient", min_value=0.0, max_value=1.0, value=0.02,
-                                                        help="Enter the friction loss coefficient.", key="friction_loss_coefficient")
+                                                        help="Enter the minor loss coefficient (sum of K for fittings and valves).", key="friction_loss_coefficient")
 
     ## Pump Speed (RPM)
     pump_speed = st.sidebar.number_input("Pump Speed (RPM)", min_value=100.0, max_value=5000.0, value=1500.0,
@@ -285,70 +353,90 @@ def main():
     maintenance_cost = st.sidebar.number_input("Maintenance Cost (currency/year)", min_value=0.0, max_value=10000.0, value=1000.0,
                                                help="Enter the maintenance cost.", key="maintenance_cost")
 
+    st.sidebar.header("Hourly Profiles")
+    intensity_file = st.sidebar.file_uploader("Grid Carbon Intensity (metric tons per kWh, 8760 hourly values)", type="csv",
+                                              help="Optional. One value per hour of the year; the last column is used.", key="intensity_profile")
+    tariff_file = st.sidebar.file_uploader("Energy Tariff (currency/kWh, 8760 hourly values)", type="csv",
+                                           help="Optional. One value per hour of the year; the last column is used.", key="tariff_profile")
+
+    current_inputs = {
+        "pump_type": pump_type, "power_rating": power_rating, "operating_hours": operating_hours,
+        "pressure_boost": pressure_boost, "efficiency": efficiency, "leakage_rate": leakage_rate,
+        "pipe_length": pipe_length, "pipe_diameter": pipe_diameter, "flow_velocity": flow_velocity,
+        "pipe_material": pipe_material, "fluid_density": fluid_density, "fluid_viscosity": fluid_viscosity,
+        "friction_loss_coefficient": friction_loss_coefficient,
+        "static_head": static_head, "dynamic_head": dynamic_head, "mechanical_efficiency": mechanical_efficiency,
+        "emission_factor": emission_factor, "construction_emissions": construction_emissions,
+        "maintenance_emissions": maintenance_emissions, "pipeline_age": pipeline_age,
+        "energy_cost": energy_cost, "maintenance_cost": maintenance_cost,
+    }
+    current_inputs = {name: value if name in TEXT_COLUMNS else normalize_input(value) for name, value in current_inputs.items()}
+
+    st.sidebar.header("Scenarios")
+    scenario_name = st.sidebar.text_input("Scenario Name", help="Optional. Saved scenarios are listed on the Saved Scenarios page.",
+                                          key="scenario_name")
+    if st.sidebar.button("Save Scenario", key="save_scenario"):
+        key = get_scenario_store().put(current_inputs, name=scenario_name.strip() or None)
+        st.sidebar.success(f"Saved scenario {key[:8]}.")
+
+    timer.lap("Input Parsing")
     st.header("Results")
 
+    graph = session_graph()
+    inputs = fleet_columns(current_inputs)
+    graph.set_inputs({name: inputs[name][0] for name in graph.inputs})
+    energy_consumption = graph.get("energy_consumption")
     if pump_type == "Booster Pump":
-        energy_consumption = calculate_energy_consumption_booster(power_rating, operating_hours, pressure_boost)
         baseline_result = f"Baseline Energy Consumption (with Pressure Boost): {energy_consumption:.2f} kWh/day"
     else:
-        energy_consumption = calculate_energy_consumption_normal(power_rating, operating_hours)
         baseline_result = f"Baseline Energy Consumption (Normal Pump): {energy_consumption:.2f} kWh/day"
 
-    useful_energy = calculate_useful_energy(energy_consumption, efficiency)
-    useful_result = f"Useful Energy Considering Efficiency: {useful_energy:.2f} kWh/day"
+    useful_result = f"Useful Energy Considering Efficiency: {graph.get('useful_energy'):.2f} kWh/day"
 
-    friction_loss = calculate_friction_loss(pipe_length, pipe_diameter, flow_velocity)
+    friction_loss = graph.get("friction_loss")
+    friction_factor_result = f"Friction Factor (Colebrook-White): {graph.get('friction_factor'):.4f} at Reynolds Number {graph.get('reynolds_number'):,.0f}"
     friction_result = f"Friction Loss: {friction_loss:.2f} meters"
+    head_result = f"Total Head Loss: {graph.get('head_loss'):.2f} meters"
 
-    head_loss = calculate_head_loss(static_head, dynamic_head)
-    head_result = f"Total Head Loss: {head_loss:.2f} meters"
-
-    mechanical_loss = calculate_mechanical_loss(power_rating, mechanical_efficiency)
+    mechanical_loss = graph.get("mechanical_loss")
     mechanical_result = f"Mechanical Loss: {mechanical_loss:.2f} kW"
 
-    co2_emissions = calculate_co2_emissions(useful_energy, emission_factor)
+    co2_emissions = graph.get("co2_emissions")
     co2_result = f"Baseline CO2 Emissions: {co2_emissions:.4f} metric tons/day"
 
-    additional_co2_emissions = 0
+    additional_co2_emissions = graph.get("additional_co2_emissions")
     if leakage_rate > 0:
         st.subheader("Impact of Leakage")
-        increased_operating_hours = calculate_increased_operating_hours(operating_hours, leakage_rate)
-        leakage_hours_result = f"Increased Operating Hours due to Leakage: {increased_operating_hours:.2f} hours/day"
-
-        additional_energy_consumption = calculate_additional_energy_consumption(power_rating, increased_operating_hours, operating_hours)
-        additional_energy_result = f"Additional Energy Consumption due to Leakage: {additional_energy_consumption:.2f} kWh/day"
-
-        additional_co2_emissions = calculate_co2_emissions(additional_energy_consumption, emission_factor)
+        leakage_hours_result = f"Increased Operating Hours due to Leakage: {graph.get('increased_operating_hours'):.2f} hours/day"
+        additional_energy_result = f"Additional Energy Consumption due to Leakage: {graph.get('additional_energy_consumption'):.2f} kWh/day"
         additional_co2_result = f"Additional CO2 Emissions due to Leakage: {additional_co2_emissions:.4f} metric tons/day"
 
-    total_co2_emissions = co2_emissions + additional_co2_emissions
+    total_co2_emissions = graph.get("total_co2_emissions")
     total_co2_result = f"Total CO2 Emissions (with Leakage): {total_co2_emissions:.4f} metric tons/day"
 
-    construction_maintenance_emissions = calculate_construction_maintenance_emissions(construction_emissions, maintenance_emissions, pipeline_age)
+    construction_maintenance_emissions = graph.get("construction_maintenance_emissions")
     construction_maintenance_result = f"Total Construction and Maintenance Emissions: {construction_maintenance_emissions:.2f} metric tons"
+    timer.lap("Calculation")
 
     col1, col2 = st.columns(2)
 
     with col1:
-        loss_labels = ['Energy Consumption', 'Friction Loss', 'Mechanical Loss', 'Construction & Maintenance Emissions']
-        loss_values = [energy_consumption, friction_loss, mechanical_loss, construction_maintenance_emissions]
-
-        loss_df = pd.DataFrame({
-            'Loss Type': loss_labels,
-            'Values': loss_values
-        })
+        loss_df = graph.get("loss_frame")
+        timer.lap("DataFrame Building")
 
         st.subheader("Energy & Emission Loss Distribution")
-        st.bar_chart(loss_df.set_index('Loss Type'))
+        bar_chart(loss_df)
 
         st.subheader("CO2 Emissions Trend")
         emission_data = np.array([co2_emissions, co2_emissions + additional_co2_emissions, total_co2_emissions])
-        st.line_chart(emission_data)
+        line_chart(emission_data)
+        timer.lap("Chart Rendering")
 
     with col2:
         st.header("Detailed Results")
         st.markdown(f"{baseline_result}")
         st.markdown(f"{useful_result}")
+        st.markdown(f"{friction_factor_result}")
         st.markdown(f"{friction_result}")
         st.markdown(f"{head_result}")
         st.markdown(f"{mechanical_result}")
@@ -362,24 +450,132 @@ def main():
 
         st.markdown(f"{total_co2_result}")
         st.markdown(f"{construction_maintenance_result}")
+    timer.lap("Results Output")
 
     # # Additional Visualizations
     st.subheader("Cost Analysis")
-    total_energy_cost = energy_cost * energy_consumption * 365  # # Annual cost
-    total_maintenance_cost = maintenance_cost * 365  # # Annual cost
-    total_cost = total_energy_cost + total_maintenance_cost
-    cost_result = f"Total Annual Cost: {total_cost:.2f} currency units"
-
-    cost_labels = ['Energy Cost', 'Maintenance Cost']
-    cost_values = [total_energy_cost, total_maintenance_cost]
-
-    cost_df = pd.DataFrame({
-        'Cost Type': cost_labels,
-        'Values': cost_values
-    })
+    cost_df = graph.get("cost_frame")
+    cost_result = f"Total Annual Cost: {graph.get('total_cost'):.2f} currency units"
+    timer.lap("DataFrame Building")
 
-    st.bar_chart(cost_df.set_index('Cost Type'))
+    bar_chart(cost_df)
     st.markdown(f"{cost_result}")
+    timer.lap("Chart Rendering")
+
+    st.subheader("Pump Operating Point")
+    with st.expander("Where does the pump operate on its curve?"):
+        st.markdown("The flow rate, head and pump efficiency in the sidebar are taken as the best efficiency point at the rated speed.")
+        speed_percent = st.slider("Pump Speed (% of rated speed)", min_value=50, max_value=100, value=100, step=5,
+                                  help="Speed set by a variable frequency drive.", key="vfd_speed")
+        operating_pump = {
+            "flow_rate": normalize_input(flow_rate), "head": normalize_input(head), "best_efficiency": normalize_input(efficiency),
+            "pump_speed": normalize_input(pump_speed), "static_head": normalize_input(static_head),
+            "pipe_length": normalize_input(pipe_length), "pipe_diameter": normalize_input(pipe_diameter), "pipe_material": pipe_material,
+            "fluid_density": normalize_input(fluid_density), "fluid_viscosity": normalize_input(fluid_viscosity),
+            "friction_loss_coefficient": normalize_input(friction_loss_coefficient),
+            "operating_hours": normalize_input(operating_hours), "emission_factor": normalize_input(emission_factor),
+        }
+        timer.lap("Input Parsing")
+        study = cached_speed_study(operating_pump, tuple(np.arange(50, 101, 5) / 100))
+        timer.lap("Calculation")
+        point = study.loc[speed_percent / 100]
+        if point["feasible"]:
+            st.markdown(f"Operating Flow Rate: {point['operating_flow_rate']:.2f} m³/h")
+            st.markdown(f"Operating Head: {point['operating_head']:.2f} meters")
+            st.markdown(f"Pump Efficiency at Operating Point: {point['operating_efficiency']:.1f} %")
+            st.markdown(f"Shaft Power: {point['shaft_power']:.2f} kW")
+            st.markdown(f"Energy Consumption at Operating Point: {point['energy_consumption']:.2f} kWh/day")
+            st.markdown(f"CO2 Emissions at Operating Point: {point['co2_emissions']:.4f} metric tons/day")
+        else:
+            st.warning("The pump cannot overcome the static head at this speed.")
+        speed_df = study[["shaft_power", "operating_flow_rate"]].rename(columns={
+            "shaft_power": "Shaft Power (kW)", "operating_flow_rate": "Flow Rate (m³/h)"})
+        speed_df.index = (speed_df.index * 100).round().astype(int)
+        speed_df.index.name = "Speed (%)"
+        timer.lap("DataFrame Building")
+        line_chart(speed_df)
+        timer.lap("Chart Rendering")
+
+    st.subheader("Sensitivity Analysis")
+    with st.expander("Which inputs drive the results?"):
+        sensitivity_output = st.selectbox("Output", list(SENSITIVITY_OUTPUTS), format_func=SENSITIVITY_OUTPUTS.get,
+                                          key="sensitivity_output")
+        variation = st.slider("Variation (% of each input's range)", min_value=1, max_value=50, value=10,
+                              help="Each input is varied by this share of its sidebar range around its current value.",
+                              key="sensitivity_variation")
+        timer.lap("Input Parsing")
+        tornado_df, indices_df = cached_sensitivity(current_inputs, sensitivity_output, variation)
+        timer.lap("Calculation")
+
+        st.markdown("**Tornado Chart**: change in the output when each input moves to the low or high end of its range")
+        bar_chart(tornado_df, horizontal=True)
+        st.markdown("**Sobol Indices**: share of the output variance explained by each input alone (S1) and with interactions (ST)")
+        st.dataframe(indices_df.sort_values("ST", ascending=False))
+        timer.lap("Chart Rendering")
+
+    st.subheader("Lifecycle Projection")
+    with st.expander("How do emissions and cost develop over the years?"):
+        col1, col2, col3 = st.columns(3)
+        horizon = col1.slider("Horizon (years)", min_value=5, max_value=50, value=30, key="lifecycle_horizon")
+        pump_age = col1.number_input("Pump Age (years)", min_value=0.0, max_value=50.0, value=0.0, key="lifecycle_pump_age")
+        replacement_interval = col1.number_input("Replacement Interval (years)", min_value=1.0, max_value=50.0, value=25.0,
+                                                 key="lifecycle_replacement_interval")
+        efficiency_degradation = col2.number_input("Efficiency Degradation (% points/year)", min_value=0.0, max_value=5.0,
+                                                   value=0.5, step=0.1, key="lifecycle_efficiency_degradation")
+        leakage_growth = col2.number_input("Leakage Growth (% points/year)", min_value=0.0, max_value=5.0, value=0.5, step=0.1,
+                                           key="lifecycle_leakage_growth")
+        replacement_emissions = col2.number_input("Replacement Emissions (metric tons)", min_value=0.0, value=5.0,
+                                                  key="lifecycle_replacement_emissions")
+        grid_reduction = col3.number_input("Grid Decarbonization (%/year)", min_value=0.0, max_value=20.0, value=3.0, step=0.5,
+                                           help="Yearly fall of the emission factor (down to 10% of today's).", key="lifecycle_grid_reduction")
+        price_escalation = col3.number_input("Energy Price Escalation (%/year)", min_value=-10.0, max_value=20.0, value=2.0,
+                                             step=0.5, key="lifecycle_price_escalation")
+        replacement_cost = col3.number_input("Replacement Cost (currency units)", min_value=0.0, value=20000.0, step=1000.0,
+                                             key="lifecycle_replacement_cost")
+        lifecycle_pump = dict(current_inputs, pump_age=normalize_input(pump_age),
+                              replacement_interval=normalize_input(replacement_interval),
+                              efficiency_degradation=normalize_input(efficiency_degradation),
+                              leakage_growth=normalize_input(leakage_growth),
+                              replacement_emissions=normalize_input(replacement_emissions),
+                              replacement_cost=normalize_input(replacement_cost))
+        timer.lap("Input Parsing")
+        lifecycle_df = cached_lifecycle(lifecycle_pump, horizon, normalize_input(grid_reduction), normalize_input(price_escalation))
+        timer.lap("Calculation")
+        st.markdown(f"Total CO2 Emissions over {horizon} years: {lifecycle_df['total_co2_emissions'].sum():.2f} metric tons")
+        st.markdown(f"Total Cost over {horizon} years: {lifecycle_df['total_cost'].sum():.2f} currency units")
+        st.markdown(f"Pump Replacements: {lifecycle_df['replacements'].sum():.0f}")
+        co2_df = lifecycle_df[["operational_co2_emissions", "embodied_emissions"]].rename(columns={
+            "operational_co2_emissions": "Operational CO2 (metric tons/year)", "embodied_emissions": "Embodied CO2 (metric tons/year)"})
+        cost_df = lifecycle_df[["energy_cost", "maintenance_cost", "replacement_cost"]].rename(columns={
+            "energy_cost": "Energy Cost", "maintenance_cost": "Maintenance Cost", "replacement_cost": "Replacement Cost"})
+        timer.lap("DataFrame Building")
+        bar_chart(co2_df)
+        bar_chart(cost_df)
+        timer.lap("Chart Rendering")
+
+    if intensity_file is not None or tariff_file is not None:
+        st.subheader("Hourly Emissions and Cost")
+        try:
+            intensity = load_uploaded_profile(intensity_file.getvalue(), intensity_file.name) if intensity_file is not None \
+                else np.full(HOURS_PER_YEAR, emission_factor)
+            tariff = load_uploaded_profile(tariff_file.getvalue(), tariff_file.name) if tariff_file is not None \
+                else np.full(HOURS_PER_YEAR, energy_cost)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            daily_df, hourly_df, annual_co2, annual_cost = cached_hourly_summary(
+                pump_type, normalize_input(power_rating), normalize_input(operating_hours), normalize_input(pressure_boost),
+                normalize_input(efficiency), normalize_input(leakage_rate), intensity, tariff)
+            timer.lap("Calculation")
+            resolution = st.radio("Resolution", ["Daily", "Hourly"], horizontal=True, key="hourly_resolution",
+                                  help="Hourly charts are downsampled for display; zoom in to see every hour.")
+            line_chart(daily_df if resolution == "Daily" else hourly_df, key="hourly_zoom")
+            st.markdown(f"Annual CO2 Emissions (hourly grid intensity): {annual_co2:.2f} metric tons")
+            st.markdown(f"Annual Energy Cost (hourly tariff): {annual_cost:.2f} currency units")
+            timer.lap("Chart Rendering")
+
+    if timer.enabled:
+        show_stage_timings(timer)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calculations import (
+    convert_units,
+    calculate_energy_consumption_normal,
+    calculate_energy_consumption_booster,
+    calculate_useful_energy,
+    calculate_co2_emissions,
+    calculate_increased_operating_hours,
+    calculate_additional_energy_consumption,
+    calculate_pipe_friction_factor,
+    calculate_friction_loss,
+    calculate_head_loss,
+    calculate_mechanical_loss,
+    calculate_construction_maintenance_emissions,
+)
+from fleet import calculate_fleet_arrays
+
+## Batch sizes; "scalar" calls each function with plain Python floats
+SIZES = {"scalar": 1, "1k": 1_000, "100k": 100_000, "10M": 10_000_000}
+
+## Run by default; the larger sizes need several GB of memory and only run when asked for (--large or --sizes)
+DEFAULT_SIZES = ["scalar", "1k", "100k"]
+
+BENCHMARKS = {
+    "convert_units": lambda d: convert_units(d["power_rating"], "hp", "kW"),
+    "calculate_energy_consumption_normal": lambda d: calculate_energy_consumption_normal(d["power_rating"], d["operating_hours"]),
+    "calculate_energy_consumption_booster": lambda d: calculate_energy_consumption_booster(
+        d["power_rating"], d["operating_hours"], d["pressure_boost"]),
+    "calculate_useful_energy": lambda d: calculate_useful_energy(d["power_rating"], d["efficiency"]),
+    "calculate_co2_emissions": lambda d: calculate_co2_emissions(d["power_rating"], d["emission_factor"]),
+    "calculate_increased_operating_hours": lambda d: calculate_increased_operating_hours(d["operating_hours"], d["leakage_rate"]),
+    "calculate_additional_energy_consumption": lambda d: calculate_additional_energy_consumption(
+        d["power_rating"], d["operating_hours"] * 1.1, d["operating_hours"]),
+    "calculate_pipe_friction_factor": lambda d: calculate_pipe_friction_factor(
+        d["pipe_diameter"], d["flow_velocity"], "Steel", d["fluid_density"], d["fluid_viscosity"]),
+    "calculate_friction_loss": lambda d: calculate_friction_loss(d["pipe_length"], d["pipe_diameter"], d["flow_velocity"]),
+    "calculate_head_loss": lambda d: calculate_head_loss(d["static_head"], d["dynamic_head"]),
+    "calculate_mechanical_loss": lambda d: calculate_mechanical_loss(d["power_rating"], d["mechanical_efficiency"]),
+    "calculate_construction_maintenance_emissions": lambda d: calculate_construction_maintenance_emissions(
+        d["construction_emissions"], d["maintenance_emissions"], d["pipeline_age"]),
+    "results_pipeline": lambda d: calculate_fleet_arrays(d),
+}
+
+def make_inputs(size, seed=0):
+    rng = np.random.default_rng(seed)
+    inputs = {
+        "pump_type": np.where(rng.random(size) < 0.3, "Booster Pump", "Water Distribution Pumps"),
+        "power_rating": rng.uniform(1, 500, size),
+        "operating_hours": rng.uniform(0, 24, size),
+        "pressure_boost": rng.uniform(0, 10, size),
+        "efficiency": rng.uniform(50, 95, size),
+        "leakage_rate": rng.uniform(0, 20, size),
+        "pipe_length": rng.uniform(1, 1000, size),
+        "pipe_diameter": rng.uniform(0.1, 5, size),
+        "flow_velocity": rng.uniform(0.1, 10, size),
+        "fluid_density": rng.uniform(900, 1100, size),
+        "fluid_viscosity": rng.uniform(0.001, 0.01, size),
+        "static_head": rng.uniform(0, 100, size),
+        "dynamic_head": rng.uniform(0, 100, size),
+        "mechanical_efficiency": rng.uniform(70, 99, size),
+        "emission_factor": rng.uniform(0.0002, 0.0009, size),
+        "construction_emissions": rng.uniform(100, 1000, size),
+        "maintenance_emissions": rng.uniform(1, 50, size),
+        "pipeline_age": rng.uniform(0, 100, size),
+        "energy_cost": rng.uniform(0.05, 0.3, size),
+        "maintenance_cost": rng.uniform(100, 5000, size),
+    }
+    if size == 1:
+        inputs = {name: value[0].item() for name, value in inputs.items()}
+    return inputs
+
+def time_call(func, inputs, min_time=0.2):
+    # # Repeat until min_time has passed and report the best per-call time
+    best = float("inf")
+    elapsed = 0.0
+    while elapsed < min_time or best == float("inf"):
+        start = time.perf_counter()
+        func(inputs)
+        duration = time.perf_counter() - start
+        best = min(best, duration)
+        elapsed += duration
+    return best
+
+def peak_memory(func, inputs):
+    tracemalloc.start()
+    try:
+        func(inputs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def time_app_rerun(reruns=5):
+    # # Full main() rerun through Streamlit's app test harness
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py"),
+                            default_timeout=120)
+    app.run()
+    best = float("inf")
+    for _ in range(reruns):
+        start = time.perf_counter()
+        app.run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(sizes, names, app=False):
+    results = []
+    for size_name in sizes:
+        size = SIZES[size_name]
+        inputs = make_inputs(size)
+        for name in names:
+            func = BENCHMARKS[name]
+            seconds = time_call(func, inputs)
+            results.append({
+                "benchmark": name,
+                "size": size_name,
+                "seconds": seconds,
+                "rows_per_second": size / seconds,
+                "peak_memory_mb": peak_memory(func, inputs) / 1e6,
+            })
+        del inputs
+    if app:
+        seconds = time_app_rerun()
+        results.append({"benchmark": "app_rerun", "size": "scalar", "seconds": seconds,
+                        "rows_per_second": 1 / seconds, "peak_memory_mb": float("nan")})
+    return results
+
+def compare(results, baseline, threshold):
+    # # A benchmark regresses when it is slower than threshold x its baseline time
+    previous = {(r["benchmark"], r["size"]): r["seconds"] for r in baseline}
+    regressions = []
+    for r in results:
+        key = (r["benchmark"], r["size"])
+        if key in previous and r["seconds"] > previous[key] * threshold:
+            regressions.append((key, previous[key], r["seconds"]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the calculation functions and the results pipeline.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=DEFAULT_SIZES,
+                        help=f"Batch sizes to run (default: {' '.join(DEFAULT_SIZES)}).")
+    parser.add_argument("--large", action="store_true",
+                        help="Also run the sizes left out by default (10M rows, needs several GB of memory).")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS), help="Benchmarks to run.")
+    parser.add_argument("--app", action="store_true", help="Also time a full Streamlit rerun of main().")
+    parser.add_argument("--json", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Baseline JSON file from an earlier --json run.")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown factor reported as a regression (default: 1.25).")
+    args = parser.parse_args(argv)
+
+    sizes = list(args.sizes) + [name for name in SIZES if args.large and name not in args.sizes]
+    results = run(sizes, args.only, args.app)
+
+    print(f"{'benchmark':<46}{'size':>8}{'time':>14}{'rows/s':>16}{'peak MB':>10}")
+    for r in results:
+        print(f"{r['benchmark']:<46}{r['size']:>8}{r['seconds'] * 1e6:>12.1f}us{r['rows_per_second']:>16,.0f}{r['peak_memory_mb']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for (name, size), before, after in regressions:
+            print(f"REGRESSION {name} [{size}]: {before * 1e6:.1f}us -> {after * 1e6:.1f}us", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+from collections import deque
+
+import numpy as np
+
+## Version of the calculation model; bump it whenever a calculate_* function's results change, so results
+## stored under the old version (e.g. in the scenario store) are recalculated rather than reused
+CALCULATION_VERSION = 1
+
+## Conversion factors for unit conversions (inverse and chained conversions are derived below)
+CONVERSION_FACTORS = {
+    "m³/s to liters/s": 1000,
+    "m³/s to ft³/s": 35.3147,
+    "gallon/s to m³/s": 0.00378541,
+    "liters to m³": 0.001,
+    "m³ to liters": 1000,
+    "m to feet": 3.28084,
+    "feet to m": 0.3048,
+    "bar to Pa": 100000,
+    "bar to psi": 14.5038,
+    "atm to Pa": 101325,
+    "psi to kPa": 6.89476,
+    "kWh to MJ": 3.6,
+    "hp to kW": 0.7457,
+    "kW to hp": 1.341,
+    "metric ton to kg": 1000,
+    "kg to metric ton": 0.001,
+    "m/s to km/h": 3.6,
+    "m/s to mph": 2.23694,
+    "CO2 kg to metric ton": 0.001,
+    "metric ton to lbs": 2204.62,
+    "m³/s to m³/h": 3600,
+    "m to mm": 1000,
+    "kPa to Pa": 1000,
+    "L/s to liters/s": 1,  # # Aliases used by the sidebar widgets
+    "ft to feet": 1,
+}
+
+def _build_conversion_table(conversion_factors):
+    graph = {}
+    for key, factor in conversion_factors.items():
+        from_unit, to_unit = key.split(" to ")
+        graph.setdefault(from_unit, {})[to_unit] = factor
+        graph.setdefault(to_unit, {}).setdefault(from_unit, 1 / factor)
+
+    table = {}
+    for source in graph:
+        # # Breadth-first search, so every pair uses the shortest chain of listed factors
+        reached = {source: 1.0}
+        queue = deque([source])
+        while queue:
+            unit = queue.popleft()
+            for neighbour, factor in graph[unit].items():
+                if neighbour not in reached:
+                    reached[neighbour] = reached[unit] * factor
+                    queue.append(neighbour)
+        for target, factor in reached.items():
+            table[(source, target)] = factor
+    return table
+
+## Factor for every convertible (from_unit, to_unit) pair, resolved once at import
+UNIT_CONVERSIONS = _build_conversion_table(CONVERSION_FACTORS)
+
+def unit_factor(from_unit, to_unit):
+    if isinstance(from_unit, str):
+        if from_unit == to_unit:
+            return 1.0
+        try:
+            return UNIT_CONVERSIONS[(from_unit, to_unit)]
+        except KeyError:
+            raise ValueError(f"No conversion from {from_unit!r} to {to_unit!r}") from None
+
+    # # One unit per row: resolve each distinct unit once, then gather the factors
+    units, inverse = np.unique(np.asarray(from_unit, dtype=str), return_inverse=True)
+    factors = np.array([unit_factor(str(unit), to_unit) for unit in units])
+    return factors[inverse].reshape(np.shape(from_unit))
+
+def convert_units(value, from_unit, to_unit):
+    return value * unit_factor(from_unit, to_unit)
+
+def convert_columns(df, conversions):
+    # # conversions maps a column name to (from_unit, to_unit); from_unit may also be a column of units
+    return df.assign(**{
+        column: convert_units(df[column].to_numpy(), df[from_unit].to_numpy() if from_unit in df.columns else from_unit, to_unit)
+        for column, (from_unit, to_unit) in conversions.items()
+    })
+
+def calculate_energy_consumption_normal(power_rating, operating_hours):
+    return power_rating * operating_hours
+
+def calculate_energy_consumption_booster(power_rating, operating_hours, pressure_boost):
+    return power_rating * operating_hours * (1 + pressure_boost / 10)
+
+def calculate_useful_energy(energy_consumption, efficiency):
+    return energy_consumption * (efficiency / 100)
+
+def calculate_co2_emissions(energy_consumption, emission_factor):
+    return energy_consumption * emission_factor
+
+def calculate_increased_operating_hours(operating_hours, leakage_rate):
+    return operating_hours * (1 + leakage_rate / 100)
+
+def calculate_additional_energy_consumption(power_rating, increased_operating_hours, operating_hours):
+    return power_rating * (increased_operating_hours - operating_hours)
+
+## Absolute roughness of the pipe wall (m)
+PIPE_ROUGHNESS = {
+    "PVC": 1.5e-6,
+    "Copper": 1.5e-6,
+    "Steel": 4.5e-5,
+}
+
+LAMINAR_REYNOLDS_NUMBER = 2300
+
+def pipe_roughness(pipe_material):
+    if isinstance(pipe_material, str):
+        try:
+            return PIPE_ROUGHNESS[pipe_material]
+        except KeyError:
+            raise ValueError(f"Unknown pipe material {pipe_material!r}, expected one of {list(PIPE_ROUGHNESS)}") from None
+
+    materials, inverse = np.unique(np.asarray(pipe_material, dtype=str), return_inverse=True)
+    roughness = np.array([pipe_roughness(str(material)) for material in materials])
+    return roughness[inverse].reshape(np.shape(pipe_material))
+
+def calculate_reynolds_number(fluid_density, flow_velocity, pipe_diameter, fluid_viscosity):
+    return fluid_density * flow_velocity * pipe_diameter / fluid_viscosity
+
+def calculate_friction_factor(reynolds_number, relative_roughness, initial_friction_factor=None, tolerance=1e-10, max_iterations=20):
+    reynolds_number, relative_roughness = np.broadcast_arrays(
+        np.maximum(np.asarray(reynolds_number, dtype=np.float64), 1e-9), np.asarray(relative_roughness, dtype=np.float64))
+
+    # # Colebrook-White, 1/sqrt(f) = -2 log10(e/3.7D + 2.51/(Re sqrt(f))), solved by Newton's method on x = 1/sqrt(f)
+    # # for every pipe at once, starting from a previous solution or the Swamee-Jain approximation
+    turbulent_reynolds = np.maximum(reynolds_number, LAMINAR_REYNOLDS_NUMBER)
+    if initial_friction_factor is None:
+        initial_friction_factor = 0.25 / np.log10(relative_roughness / 3.7 + 5.74 / turbulent_reynolds ** 0.9) ** 2
+    x = 1 / np.sqrt(np.broadcast_to(initial_friction_factor, reynolds_number.shape))
+    for _ in range(max_iterations):
+        argument = relative_roughness / 3.7 + 2.51 * x / turbulent_reynolds
+        residual = x + 2 * np.log10(argument)
+        step = residual / (1 + 2 * 2.51 / (turbulent_reynolds * argument * np.log(10)))
+        x = x - step
+        if np.max(np.abs(step), initial=0.0) < tolerance:
+            break
+
+    friction_factor = np.where(reynolds_number < LAMINAR_REYNOLDS_NUMBER, 64 / reynolds_number, 1 / x ** 2)
+    return friction_factor if friction_factor.ndim else float(friction_factor)
+
+def calculate_pipe_friction_factor(pipe_diameter, flow_velocity, pipe_material, fluid_density, fluid_viscosity, initial_friction_factor=None):
+    reynolds_number = calculate_reynolds_number(fluid_density, flow_velocity, pipe_diameter, fluid_viscosity)
+    relative_roughness = pipe_roughness(pipe_material) / pipe_diameter
+    return calculate_friction_factor(reynolds_number, relative_roughness, initial_friction_factor)
+
+def calculate_friction_loss(pipe_length, pipe_diameter, flow_velocity, friction_factor=0.02, friction_loss_coefficient=0.0):
+    g = 9.81  # # Gravitational acceleration (m/s²)
+    # # Darcy-Weisbach pipe friction plus minor losses (friction_loss_coefficient is the summed K of fittings)
+    friction_loss = (friction_factor * (pipe_length / pipe_diameter) + friction_loss_coefficient) * (flow_velocity ** 2) / (2 * g)
+    return friction_loss
+
+def calculate_head_loss(static_head, dynamic_head):
+    return static_head + dynamic_head
+
+def calculate_mechanical_loss(input_power, mechanical_efficiency):
+    return input_power * (1 - mechanical_efficiency / 100)
+
+def calculate_construction_maintenance_emissions(construction_emissions, maintenance_emissions, pipeline_age):
+    return construction_emissions + (maintenance_emissions * pipeline_age)
+
+def calculate_annual_energy_cost(energy_cost, energy_consumption):
+    return energy_cost * energy_consumption * 365
+
+def calculate_annual_maintenance_cost(maintenance_cost):
+    return maintenance_cost * 365
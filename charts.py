@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+## Most points sent to the browser per line chart (shared between its series)
+MAX_CHART_POINTS = 2000
+
+## Most bars per categorical bar chart; the smallest remaining categories are summed into one "Other" bar
+MAX_CHART_BARS = 50
+
+## Bins of a distribution chart
+HISTOGRAM_BINS = 50
+
+## Points of each zoom level relative to the next coarser one; the finest level has at most a
+## ZOOM_LEVEL_FACTOR-th of the rows, as every level costs one pass per bucket to build
+ZOOM_LEVEL_FACTOR = 4
+
+## Pyramids kept per server for re-zooming large charts
+PYRAMID_CACHE_ENTRIES = 32
+
+def lttb(x, y, threshold):
+    # # Largest-Triangle-Three-Buckets: positions of threshold points that keep the visual shape of (x, y).
+    # # The first and last points are kept; from every bucket in between, the point forming the largest
+    # # triangle with the point kept from the previous bucket and the mean of the next bucket.
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    size = len(x)
+    if threshold >= size:
+        return np.arange(size)
+    if threshold < 3:
+        return np.array([0, size - 1][:threshold], dtype=np.intp)
+
+    # # Bucket i covers edges[i]:edges[i + 1]; the last bucket's next "bucket" is just the last point
+    edges = np.minimum((np.arange(threshold) * ((size - 2) / (threshold - 2))).astype(np.intp) + 1, size)
+    mean_starts, mean_stops = edges[1:-1], np.minimum(edges[2:], size)
+    next_x = np.add.reduceat(x, mean_starts) / (mean_stops - mean_starts)
+    next_y = np.add.reduceat(y, mean_starts) / (mean_stops - mean_starts)
+
+    # # One pass: each bucket's triangles use the point already kept from the previous bucket
+    chosen = np.empty(threshold, dtype=np.intp)
+    chosen[0], chosen[-1] = 0, size - 1
+    kept = 0
+    for bucket, (start, stop) in enumerate(zip(edges[:-2].tolist(), edges[1:-1].tolist()), start=1):
+        ax, ay = x[kept], y[kept]
+        area = np.abs((ax - next_x[bucket - 1]) * (y[start:stop] - ay)
+                      - (ax - x[start:stop]) * (next_y[bucket - 1] - ay))
+        kept = start + int(area.argmax())
+        chosen[bucket] = kept
+    return chosen
+
+def _chart_x(index):
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(np.float64)
+    if pd.api.types.is_numeric_dtype(index):
+        return index.to_numpy(dtype=np.float64)
+    return np.arange(len(index), dtype=np.float64)
+
+def downsample_positions(frame, max_points=MAX_CHART_POINTS):
+    # # Union of every column's LTTB points, each column getting an equal share of max_points
+    if len(frame) <= max_points:
+        return np.arange(len(frame))
+    x = _chart_x(frame.index)
+    share = max(max_points // max(frame.shape[1], 1), 3)
+    kept = []
+    for name in frame.columns:
+        y = frame[name].to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(y))
+        kept.append(valid[lttb(x[valid], y[valid], share)])
+    return np.unique(np.concatenate(kept)) if kept else np.arange(0)
+
+def downsample(frame, max_points=MAX_CHART_POINTS):
+    frame = pd.DataFrame(frame)
+    return frame.iloc[downsample_positions(frame, max_points)]
+
+def top_bars(frame, max_bars=MAX_CHART_BARS, other="Other"):
+    # # The max_bars - 1 largest rows (by total absolute value) plus the sum of all others, for categorical bars
+    frame = pd.DataFrame(frame)
+    if len(frame) <= max_bars:
+        return frame
+    order = np.argsort(-frame.abs().sum(axis=1).to_numpy(), kind="stable")
+    top = frame.iloc[np.sort(order[:max_bars - 1])]
+    rest = frame.iloc[order[max_bars - 1:]].sum().to_frame(other).T
+    bars = pd.concat([top, rest])
+    bars.index = pd.Index(top.index.astype(str).tolist() + [other], name=frame.index.name)  # # One label type for Arrow
+    return bars
+
+def binned_summary(values, bins=HISTOGRAM_BINS):
+    # # Count, min, mean and max of the values in equal-width bins over their range, indexed by bin center
+    values = np.asarray(values, dtype=np.float64).ravel()
+    values = np.sort(values[~np.isnan(values)])
+    if len(values) == 0:
+        return pd.DataFrame(columns=["count", "min", "mean", "max"], index=pd.Index([], name="value"))
+    if values[-1] > values[0]:
+        edges = np.linspace(values[0], values[-1], bins + 1)
+    else:  # # All values equal: one narrow bin centred on the value
+        width = max(abs(values[0]), 1.0) * 1e-6
+        edges = values[0] + np.array([-width, width]) / 2
+    bounds = np.searchsorted(values, edges[1:-1], side="left")
+    starts, stops = np.r_[0, bounds], np.r_[bounds, len(values)]
+    counts = stops - starts
+    sums = np.r_[0.0, np.cumsum(values)]
+    filled = counts > 0
+    with np.errstate(invalid="ignore"):
+        return pd.DataFrame({
+            "count": counts,
+            "min": np.where(filled, values[np.minimum(starts, len(values) - 1)], np.nan),
+            "mean": (sums[stops] - sums[starts]) / counts,
+            "max": np.where(filled, values[np.maximum(stops - 1, 0)], np.nan),
+        }, index=pd.Index((edges[:-1] + edges[1:]) / 2, name="value"))
+
+class ZoomPyramid:
+    # # Downsamples of a sorted-index frame at max_points, 4 x max_points, 16 x max_points, ... points, each
+    # # built from the next finer one. view() answers any zoom range from the finest level with at most
+    # # max_points points inside it, so zooming in reveals detail without re-downsampling the full data.
+    def __init__(self, frame, max_points=MAX_CHART_POINTS):
+        self.frame = pd.DataFrame(frame)
+        if not self.frame.index.is_monotonic_increasing:
+            self.frame = self.frame.sort_index()
+        self.max_points = max_points
+        self.levels = []  # # Positions into frame, coarsest level first
+        positions = np.arange(len(self.frame))
+        size = max_points
+        while size * ZOOM_LEVEL_FACTOR ** 2 <= len(self.frame):
+            size *= ZOOM_LEVEL_FACTOR
+        while size >= max_points:
+            if len(positions) > size:
+                positions = positions[downsample_positions(self.frame.iloc[positions], size)]
+                self.levels.insert(0, positions)
+            size //= ZOOM_LEVEL_FACTOR
+
+    def view(self, start=None, stop=None):
+        # # The rows between index labels start and stop (inclusive), at most max_points of them
+        index = self.frame.index
+        low = 0 if start is None else index.searchsorted(start, side="left")
+        high = len(index) if stop is None else index.searchsorted(stop, side="right")
+        if high - low <= self.max_points:
+            return self.frame.iloc[low:high]
+        for positions in reversed(self.levels):
+            first, last = np.searchsorted(positions, (low, high))
+            if last - first <= self.max_points:
+                break
+        return self.frame.iloc[positions[first:last]]  # # The coarsest level always fits
+
+@st.cache_resource(max_entries=PYRAMID_CACHE_ENTRIES, show_spinner=False)
+def cached_pyramid(frame, max_points):
+    return ZoomPyramid(frame, max_points)
+
+def line_chart(data, key=None, max_points=MAX_CHART_POINTS, **kwargs):
+    # # st.line_chart() that never sends more than max_points rows; with a key, large charts get a zoom
+    # # slider whose ranges are served from a cached pyramid
+    frame = pd.DataFrame(data)
+    if len(frame) <= max_points:
+        return st.line_chart(frame, **kwargs)
+    pyramid = cached_pyramid(frame, max_points)
+    start = stop = None
+    index = pyramid.frame.index
+    if key is not None and (isinstance(index, pd.DatetimeIndex) or pd.api.types.is_numeric_dtype(index)):
+        ends = index[[0, -1]]
+        first, last = ends.to_pydatetime() if isinstance(ends, pd.DatetimeIndex) else ends.tolist()
+        start, stop = st.slider("Zoom", min_value=first, max_value=last, value=(first, last), key=key)
+    return st.line_chart(pyramid.view(start, stop), **kwargs)
+
+def _ordered(index):
+    return isinstance(index, (pd.DatetimeIndex, pd.TimedeltaIndex, pd.PeriodIndex)) or pd.api.types.is_numeric_dtype(index)
+
+def bar_chart(data, max_bars=MAX_CHART_BARS, **kwargs):
+    # # Only categorical bars are lumped into "Other"; bars along a time or numeric axis keep every position
+    frame = pd.DataFrame(data)
+    return st.bar_chart(frame if _ordered(frame.index) else top_bars(frame, max_bars), **kwargs)
+
+def histogram_chart(summary, **kwargs):
+    # # Bin counts of a binned_summary(), so only the summary has to be kept for the chart
+    return st.bar_chart(summary["count"], **kwargs)
@@ -0,0 +1,145 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from calculations import PIPE_ROUGHNESS
+from fleet import FLEET_DEFAULTS, FLEET_RESULT_COLUMNS, calculate_fleet
+
+def _is_parquet(path):
+    return path.lower().endswith((".parquet", ".pq"))
+
+def read_chunks(path, chunksize):
+    if _is_parquet(path):
+        import pyarrow.parquet as pq  # # Only needed for Parquet files
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+def format_csv(result, header=False):
+    # # pyarrow's CSV writer formats numbers several times faster than DataFrame.to_csv(), at the same
+    # # round-trip precision; without pyarrow (or for columns it cannot convert) pandas writes the text
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+    except ImportError:
+        return result.to_csv(header=header, index=False)
+    try:
+        table = pa.Table.from_pandas(result, preserve_index=False)
+    except pa.ArrowException:
+        return result.to_csv(header=header, index=False)
+    buffer = pa.BufferOutputStream()
+    pa_csv.write_csv(table, buffer, pa_csv.WriteOptions(include_header=header, quoting_style="needed"))
+    return buffer.getvalue().to_pybytes().decode()
+
+def clean_pipe_materials(chunk, first_row=0):
+    # # Blank materials get the default; an unknown one stops the run with its (1-based) data row number
+    if "pipe_material" not in chunk:
+        return chunk
+    materials = chunk["pipe_material"]
+    blank = materials.isna() | (materials.astype(str).str.strip() == "")
+    materials = materials.mask(blank, FLEET_DEFAULTS["pipe_material"])
+    unknown = ~materials.isin(list(PIPE_ROUGHNESS))
+    if unknown.any():
+        position = int(unknown.to_numpy().argmax())
+        raise ValueError(f"Row {first_row + position + 1}: unknown pipe material {materials.iloc[position]!r}, "
+                         f"expected one of {list(PIPE_ROUGHNESS)}")
+    return chunk.assign(pipe_material=materials)
+
+def process_chunk(chunk, to_csv=False, header=False, first_row=0):
+    chunk = clean_pipe_materials(chunk.drop(columns=FLEET_RESULT_COLUMNS, errors="ignore"), first_row)
+    result = pd.concat([chunk, calculate_fleet(chunk)], axis=1)
+    # # CSV text is formatted here so that, with a pool, formatting also runs in the workers
+    if to_csv:
+        return len(result), format_csv(result, header)
+    return len(result), result
+
+def process_chunks(chunks, workers=1, to_csv=False):
+    first_row = 0
+    if workers <= 1:
+        for i, chunk in enumerate(chunks):
+            yield process_chunk(chunk, to_csv, i == 0, first_row)
+            first_row += len(chunk)
+        return
+
+    # # Keep a bounded number of chunks in flight so memory stays flat and output order is preserved
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for i, chunk in enumerate(chunks):
+            pending.append(pool.submit(process_chunk, chunk, to_csv, i == 0, first_row))
+            first_row += len(chunk)
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def write_chunks(path, results, progress=None):
+    rows = 0
+    if _is_parquet(path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for count, result in results:
+                table = pa.Table.from_pandas(result, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+                rows += count
+                if progress:
+                    progress(rows)
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(path, "w", newline="") as f:
+            for count, text in results:
+                f.write(text)
+                rows += count
+                if progress:
+                    progress(rows)
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calculate energy, CO2 and cost for a pump inventory file.")
+    parser.add_argument("input", help="Pump inventory (.csv or .parquet), one row per pump.")
+    parser.add_argument("output", help="Results file (.csv or .parquet).")
+    parser.add_argument("--chunksize", type=int, default=100_000, help="Rows per chunk (default: 100000).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes; 0 uses every core (default: 1).")
+    parser.add_argument("--quiet", action="store_true", help="Do not report progress.")
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    start = time.perf_counter()
+
+    def report(rows):
+        if not args.quiet:
+            elapsed = time.perf_counter() - start
+            print(f"\r{rows} rows, {rows / max(elapsed, 1e-9):,.0f} rows/s", end="", file=sys.stderr)
+
+    chunks = read_chunks(args.input, args.chunksize)
+    results = process_chunks(chunks, workers, to_csv=not _is_parquet(args.output))
+    try:
+        rows = write_chunks(args.output, results, report)
+    except ValueError as error:
+        if not args.quiet:
+            print(file=sys.stderr)
+        print(f"{args.input}: {error}", file=sys.stderr)
+        return 1
+
+    elapsed = time.perf_counter() - start
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Processed {rows} rows in {elapsed:.2f} s ({rows / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from calculations import pipe_roughness
+from graph import CalculationGraph
+
+## Columns holding text rather than numbers
+TEXT_COLUMNS = {"pump_type", "pipe_material"}
+
+## Values used for any pump parameter missing from the fleet data (same as the sidebar defaults)
+FLEET_DEFAULTS = {
+    "pump_type": "Water Distribution Pumps",
+    "power_rating": 100.0,
+    "operating_hours": 8.0,
+    "pressure_boost": 0.0,
+    "efficiency": 80.0,
+    "leakage_rate": 0.0,
+    "pipe_length": 500.0,
+    "pipe_diameter": 0.5,
+    "flow_velocity": 2.0,
+    "pipe_material": "PVC",
+    "fluid_density": 1000.0,
+    "fluid_viscosity": 0.001,
+    "friction_loss_coefficient": 0.02,
+    "static_head": 50.0,
+    "dynamic_head": 10.0,
+    "mechanical_efficiency": 90.0,
+    "emission_factor": 0.000699,
+    "construction_emissions": 500.0,
+    "maintenance_emissions": 10.0,
+    "pipeline_age": 10.0,
+    "energy_cost": 0.1,
+    "maintenance_cost": 1000.0,
+}
+
+FLEET_RESULT_COLUMNS = [
+    "energy_consumption",
+    "useful_energy",
+    "reynolds_number",
+    "friction_factor",
+    "friction_loss",
+    "head_loss",
+    "mechanical_loss",
+    "co2_emissions",
+    "increased_operating_hours",
+    "additional_energy_consumption",
+    "additional_co2_emissions",
+    "total_co2_emissions",
+    "construction_maintenance_emissions",
+    "total_energy_cost",
+    "total_maintenance_cost",
+    "total_cost",
+]
+
+def _fleet_size(columns):
+    sizes = {np.size(value) for value in columns.values() if np.ndim(value) > 0}
+    if len(sizes) > 1:
+        raise ValueError(f"Fleet columns have different lengths: {sorted(sizes)}")
+    return sizes.pop() if sizes else 1
+
+def _column(columns, name, size):
+    value = columns.get(name, FLEET_DEFAULTS[name])
+    return np.broadcast_to(np.asarray(value, dtype=np.float64), (size,))
+
+def _booster_mask(columns, size):
+    if "booster" in columns:
+        return np.broadcast_to(np.asarray(columns["booster"], dtype=bool), (size,))
+    pump_type = np.asarray(columns.get("pump_type", FLEET_DEFAULTS["pump_type"]))
+    return np.broadcast_to(pump_type == "Booster Pump", (size,))
+
+def _roughness(columns, size):
+    if "pipe_roughness" in columns:
+        return np.broadcast_to(np.asarray(columns["pipe_roughness"], dtype=np.float64), (size,))
+    return np.broadcast_to(pipe_roughness(columns.get("pipe_material", FLEET_DEFAULTS["pipe_material"])), (size,))
+
+def fleet_columns(data):
+    if isinstance(data, pd.DataFrame):
+        data = {name: data[name].to_numpy() for name in data.columns}
+    size = _fleet_size(data)
+    col = {name: _column(data, name, size) for name in FLEET_DEFAULTS if name not in TEXT_COLUMNS}
+    col["booster"] = _booster_mask(data, size)
+    col["pipe_roughness"] = _roughness(data, size)
+    # # A normal pump is a booster pump with no pressure boost, so one formula covers both
+    col["pressure_boost"] = np.where(col["booster"], col["pressure_boost"], 0.0)
+    return col
+
+def calculate_fleet_arrays(columns, outputs=FLEET_RESULT_COLUMNS):
+    # # Only the requested results, and the results they depend on, are calculated
+    col = fleet_columns(columns)
+    graph = CalculationGraph()
+    graph.set_inputs({name: col[name] for name in graph.inputs})
+    return graph.evaluate(outputs)
+
+def calculate_fleet(data):
+    index = data.index if isinstance(data, pd.DataFrame) else None
+    results = calculate_fleet_arrays(data)
+    return pd.DataFrame({name: results[name] for name in FLEET_RESULT_COLUMNS}, index=index)
@@ -0,0 +1,121 @@
+from collections import Counter
+
+import numpy as np
+
+from calculations import (
+    calculate_energy_consumption_booster,
+    calculate_useful_energy,
+    calculate_co2_emissions,
+    calculate_increased_operating_hours,
+    calculate_additional_energy_consumption,
+    calculate_friction_loss,
+    calculate_reynolds_number,
+    calculate_friction_factor,
+    calculate_head_loss,
+    calculate_mechanical_loss,
+    calculate_construction_maintenance_emissions,
+    calculate_annual_energy_cost,
+    calculate_annual_maintenance_cost,
+)
+
+## Every result as name -> (function, names of the inputs or results it is calculated from). Inputs are the
+## names no node calculates: the fleet columns of fleet_columns(), so a non-booster pump's pressure_boost is
+## already 0 and pipe_roughness is resolved from the pipe material.
+CALCULATION_NODES = {
+    "energy_consumption": (calculate_energy_consumption_booster, ("power_rating", "operating_hours", "pressure_boost")),
+    "useful_energy": (calculate_useful_energy, ("energy_consumption", "efficiency")),
+    "co2_emissions": (calculate_co2_emissions, ("useful_energy", "emission_factor")),
+    "increased_operating_hours": (calculate_increased_operating_hours, ("operating_hours", "leakage_rate")),
+    "additional_energy_consumption": (calculate_additional_energy_consumption,
+                                      ("power_rating", "increased_operating_hours", "operating_hours")),
+    "additional_co2_emissions": (calculate_co2_emissions, ("additional_energy_consumption", "emission_factor")),
+    "total_co2_emissions": (np.add, ("co2_emissions", "additional_co2_emissions")),
+    "reynolds_number": (calculate_reynolds_number, ("fluid_density", "flow_velocity", "pipe_diameter", "fluid_viscosity")),
+    "relative_roughness": (np.divide, ("pipe_roughness", "pipe_diameter")),
+    "friction_factor": (calculate_friction_factor, ("reynolds_number", "relative_roughness")),
+    "friction_loss": (calculate_friction_loss,
+                      ("pipe_length", "pipe_diameter", "flow_velocity", "friction_factor", "friction_loss_coefficient")),
+    "head_loss": (calculate_head_loss, ("static_head", "dynamic_head")),
+    "mechanical_loss": (calculate_mechanical_loss, ("power_rating", "mechanical_efficiency")),
+    "construction_maintenance_emissions": (calculate_construction_maintenance_emissions,
+                                           ("construction_emissions", "maintenance_emissions", "pipeline_age")),
+    "total_energy_cost": (calculate_annual_energy_cost, ("energy_cost", "energy_consumption")),
+    "total_maintenance_cost": (calculate_annual_maintenance_cost, ("maintenance_cost",)),
+    "total_cost": (np.add, ("total_energy_cost", "total_maintenance_cost")),
+}
+
+def _same(old, new):
+    if old is new:
+        return True
+    try:
+        return np.shape(old) == np.shape(new) and bool(np.array_equal(old, new))
+    except TypeError:
+        return False
+
+def graph_structure(nodes):
+    # # The inputs of a set of nodes and everything downstream of each input or node, failing on cycles
+    dependencies = {name: dependencies for name, (_, dependencies) in nodes.items()}
+    inputs = sorted({name for names in dependencies.values() for name in names} - set(nodes))
+
+    # # Order the nodes so every node follows its dependencies
+    order, state = [], {}
+    def visit(name, path):
+        if state.get(name) == "done" or name not in nodes:
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Calculation nodes form a cycle: {' -> '.join(path + [name])}")
+        state[name] = "visiting"
+        for dependency in dependencies[name]:
+            visit(dependency, path + [name])
+        state[name] = "done"
+        order.append(name)
+    for name in nodes:
+        visit(name, [])
+
+    downstream = {name: set() for name in inputs + order}
+    for name in reversed(order):
+        for dependency in dependencies[name]:
+            downstream[dependency] |= {name} | downstream[name]
+    return inputs, {name: frozenset(names) for name, names in downstream.items()}
+
+_DEFAULT_STRUCTURE = graph_structure(CALCULATION_NODES)
+
+class CalculationGraph:
+    # # Results are only calculated when asked for, together with just the results they depend on, and are
+    # # kept until one of their inputs changes: set_inputs() drops the results downstream of the inputs
+    # # whose values changed and nothing else. Values can be scalars or whole columns of a fleet.
+    def __init__(self, nodes=None):
+        self.nodes = CALCULATION_NODES if nodes is None else dict(nodes)
+        # # Invalidation is one lookup per changed input
+        self.inputs, self.downstream = _DEFAULT_STRUCTURE if nodes is None else graph_structure(self.nodes)
+        self.values = {}
+        self.evaluations = Counter()
+
+    def set_inputs(self, values=None, **kwargs):
+        # # Returns the names of the results that have to be recalculated
+        invalidated = set()
+        for name, value in dict(values or {}, **kwargs).items():
+            if name not in self.downstream or name in self.nodes:
+                raise ValueError(f"Unknown input {name!r}, expected one of {self.inputs}")
+            if name in self.values and _same(self.values[name], value):
+                continue
+            self.values[name] = value
+            stale = self.downstream[name] & self.values.keys()
+            for node in stale:
+                del self.values[node]
+            invalidated |= stale
+        return invalidated
+
+    def get(self, name):
+        if name not in self.values:
+            if name not in self.nodes:
+                if name in self.downstream:
+                    raise ValueError(f"Input {name!r} has not been set")
+                raise ValueError(f"Unknown result {name!r}, expected one of {sorted(self.nodes)}")
+            function, dependencies = self.nodes[name]
+            self.values[name] = function(*(self.get(dependency) for dependency in dependencies))
+            self.evaluations[name] += 1
+        return self.values[name]
+
+    def evaluate(self, outputs):
+        return {name: self.get(name) for name in outputs}
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+from calculations import (
+    calculate_energy_consumption_booster,
+    calculate_useful_energy,
+    calculate_co2_emissions,
+    calculate_increased_operating_hours,
+    calculate_additional_energy_consumption,
+)
+from fleet import fleet_columns
+
+HOURS_PER_DAY = 24
+DAYS_PER_YEAR = 365
+HOURS_PER_YEAR = HOURS_PER_DAY * DAYS_PER_YEAR
+
+def load_profile(path, hours=HOURS_PER_YEAR):
+    # # .npy and raw float64 files are memory-mapped, so every pump shares one read-only copy
+    name = getattr(path, "name", path)
+    lower = name.lower()
+    if lower.endswith(".npy"):
+        profile = np.load(path, mmap_mode="r")
+    elif lower.endswith((".bin", ".f8", ".dat")):
+        profile = np.memmap(path, dtype=np.float64, mode="r")
+    else:
+        profile = pd.read_csv(path).iloc[:, -1].to_numpy(dtype=np.float64)
+
+    if profile.shape != (hours,):
+        raise ValueError(f"Profile {name} has shape {profile.shape}, expected ({hours},)")
+    return profile
+
+def save_profile(path, profile):
+    np.save(path, np.asarray(profile, dtype=np.float64))
+
+def daily_schedule(operating_hours, start_hour=0):
+    # # Fraction of each hour of the day the pump runs, starting at start_hour
+    operating_hours = np.asarray(operating_hours, dtype=np.float64)
+    hour = (np.arange(HOURS_PER_DAY) - start_hour) % HOURS_PER_DAY
+    return np.clip(operating_hours[..., None] - hour, 0.0, 1.0)
+
+def _by_day(values):
+    # # View any (..., 24) daily or (..., 8760) yearly series as (..., 365, 24) without copying
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[-1] == HOURS_PER_DAY:
+        return values[..., None, :]
+    if values.shape[-1] == HOURS_PER_YEAR:
+        return values.reshape(values.shape[:-1] + (DAYS_PER_YEAR, HOURS_PER_DAY))
+    raise ValueError(f"Expected {HOURS_PER_DAY} or {HOURS_PER_YEAR} hourly values, got {values.shape[-1]}")
+
+def _schedule(col, schedule):
+    if schedule is None:
+        return daily_schedule(col["operating_hours"])
+    return np.asarray(schedule, dtype=np.float64)
+
+def _per_pump(col):
+    return {name: value[:, None, None] for name, value in col.items()}
+
+def calculate_hourly(fleet, intensity, tariff, schedule=None):
+    col = fleet_columns(fleet)
+    run = _by_day(_schedule(col, schedule))
+    pump = _per_pump(col)
+    intensity = _by_day(intensity)
+    tariff = _by_day(tariff)
+
+    # # Every result is (pumps, 365, 24); the profiles broadcast across pumps without being copied
+    energy = calculate_energy_consumption_booster(pump["power_rating"], run, pump["pressure_boost"])
+    useful_energy = calculate_useful_energy(energy, pump["efficiency"])
+    additional_energy = calculate_additional_energy_consumption(
+        pump["power_rating"], calculate_increased_operating_hours(run, pump["leakage_rate"]), run)
+    co2 = calculate_co2_emissions(useful_energy, intensity) + calculate_co2_emissions(additional_energy, intensity)
+    cost = energy * tariff
+
+    shape = (len(col["power_rating"]), DAYS_PER_YEAR, HOURS_PER_DAY)
+    return {
+        "energy": np.broadcast_to(energy, shape).reshape(shape[0], HOURS_PER_YEAR),
+        "co2": np.broadcast_to(co2, shape).reshape(shape[0], HOURS_PER_YEAR),
+        "cost": np.broadcast_to(cost, shape).reshape(shape[0], HOURS_PER_YEAR),
+    }
+
+def iter_hourly(fleet, intensity, tariff, schedule=None, block_size=1024):
+    col = fleet_columns(fleet)
+    schedule = _schedule(col, schedule)
+    size = len(col["power_rating"])
+    for start in range(0, size, block_size):
+        block = slice(start, min(start + block_size, size))
+        block_fleet = {name: value[block] for name, value in col.items()}
+        block_schedule = schedule[block] if schedule.ndim == 2 else schedule
+        yield block, calculate_hourly(block_fleet, intensity, tariff, block_schedule)
+
+def _weights(profile, schedule_hours):
+    profile = np.asarray(profile, dtype=np.float64)
+    if schedule_hours == HOURS_PER_DAY:
+        # # A daily schedule repeats every day, so fold the yearly profile onto one day
+        if profile.shape[-1] == HOURS_PER_YEAR:
+            return _by_day(profile).sum(axis=-2).ravel()
+        return profile * DAYS_PER_YEAR
+    if profile.shape[-1] == HOURS_PER_DAY:
+        return np.tile(profile, DAYS_PER_YEAR)
+    return profile
+
+def calculate_annual(fleet, intensity, tariff, schedule=None):
+    col = fleet_columns(fleet)
+    run = _schedule(col, schedule)
+    hours = run.shape[-1]
+
+    # # Energy, CO2 and cost are linear in running time, so the yearly totals only need
+    # # the running hours weighted by each profile, never the full (pumps, 8760) arrays
+    run_hours = run @ _weights(np.ones(HOURS_PER_DAY), hours)
+    intensity_hours = run @ _weights(intensity, hours)
+    tariff_hours = run @ _weights(tariff, hours)
+
+    energy = calculate_energy_consumption_booster(col["power_rating"], run_hours, col["pressure_boost"])
+    weighted_energy = calculate_energy_consumption_booster(col["power_rating"], intensity_hours, col["pressure_boost"])
+    additional_weighted_energy = calculate_additional_energy_consumption(
+        col["power_rating"], calculate_increased_operating_hours(intensity_hours, col["leakage_rate"]), intensity_hours)
+    co2 = calculate_co2_emissions(calculate_useful_energy(weighted_energy, col["efficiency"]), 1.0) + \
+        calculate_co2_emissions(additional_weighted_energy, 1.0)
+    cost = calculate_energy_consumption_booster(col["power_rating"], tariff_hours, col["pressure_boost"])
+
+    shape = col["power_rating"].shape
+    index = fleet.index if isinstance(fleet, pd.DataFrame) else None
+    return pd.DataFrame({
+        "annual_energy_consumption": np.broadcast_to(energy, shape),
+        "annual_co2_emissions": np.broadcast_to(co2, shape),
+        "annual_energy_cost": np.broadcast_to(cost, shape),
+    }, index=index)
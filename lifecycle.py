@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+
+from calculations import (
+    calculate_energy_consumption_booster,
+    calculate_useful_energy,
+    calculate_co2_emissions,
+    calculate_increased_operating_hours,
+    calculate_additional_energy_consumption,
+    calculate_construction_maintenance_emissions,
+)
+from fleet import fleet_columns
+from hourly import DAYS_PER_YEAR
+
+## Values used for any lifecycle parameter missing from the fleet data
+LIFECYCLE_DEFAULTS = {
+    "efficiency_degradation": 0.5,  # # Percentage points of pump efficiency lost per year of service
+    "minimum_efficiency": 30.0,  # # Efficiency never degrades below this (%)
+    "leakage_growth": 0.5,  # # Percentage points of leakage added per year
+    "pump_age": 0.0,  # # Years since the pump was installed or last replaced
+    "replacement_interval": 25.0,  # # Years between pump replacements
+    "replacement_emissions": 5.0,  # # Embodied emissions of a replacement pump (metric tons)
+    "replacement_cost": 20000.0,  # # Cost of a replacement pump (currency units)
+}
+
+## Year-by-year multipliers shared by the whole fleet (1.0 = today's value)
+LIFECYCLE_PATHS = ["grid_factor", "energy_price"]
+
+LIFECYCLE_OUTPUTS = [
+    "efficiency",
+    "leakage_rate",
+    "energy_consumption",
+    "operational_co2_emissions",
+    "embodied_emissions",
+    "total_co2_emissions",
+    "energy_cost",
+    "maintenance_cost",
+    "replacement_cost",
+    "total_cost",
+    "replacements",
+]
+
+def decarbonization_path(horizon, annual_reduction=3.0, floor=0.1):
+    # # Grid emission factor relative to today, falling by annual_reduction % a year down to floor
+    return np.maximum((1 - annual_reduction / 100) ** np.arange(horizon), floor)
+
+def escalation_path(horizon, annual_increase=2.0):
+    return (1 + annual_increase / 100) ** np.arange(horizon)
+
+def _project(col, years, grid_factor, energy_price):
+    # # col holds (pumps, 1) parameters, years and the paths are (1, years); every (pump, year) cell only
+    # # depends on its own pump and year, so any block of cells can be recomputed on its own
+    service_years = col["pump_age"] + years
+    interval = col["replacement_interval"]
+    replacements = np.where(years > 0, np.floor(service_years / interval) - np.floor((service_years - 1) / interval), 0.0)
+    age = np.mod(service_years, interval)
+
+    # # The efficiency input is today's, at pump_age; a replacement pump starts out as good as this one was new
+    first_life = np.floor(service_years / interval) == np.floor(col["pump_age"] / interval)
+    new_efficiency = np.minimum(col["efficiency"] + col["efficiency_degradation"] * col["pump_age"], 100.0)
+    efficiency = np.where(first_life, col["efficiency"] - col["efficiency_degradation"] * years,
+                          new_efficiency - col["efficiency_degradation"] * age)
+    efficiency = np.maximum(efficiency, np.minimum(col["minimum_efficiency"], col["efficiency"]))
+    leakage_rate = np.minimum(col["leakage_rate"] + col["leakage_growth"] * years, 100.0)
+    emission_factor = col["emission_factor"] * grid_factor
+
+    # # A worn pump needs more input power for the same hydraulic output, so degradation raises the energy
+    # # drawn while the useful energy stays at its rated share; year 0 matches calculate_fleet(). Without a
+    # # positive efficiency there is nothing to degrade from, so the power stays at its rating.
+    degraded = (efficiency > 0) & (col["efficiency"] > 0)
+    power = np.where(degraded, col["power_rating"] * col["efficiency"] / np.where(degraded, efficiency, 1.0),
+                     col["power_rating"])
+    pressure_boost = np.where(col["booster"], col["pressure_boost"], 0.0)
+    energy = calculate_energy_consumption_booster(power, col["operating_hours"], pressure_boost)
+    co2 = calculate_co2_emissions(calculate_useful_energy(energy, col["efficiency"]), emission_factor)
+    additional_energy = calculate_additional_energy_consumption(
+        power, calculate_increased_operating_hours(col["operating_hours"], leakage_rate), col["operating_hours"])
+    operational_co2 = (co2 + calculate_co2_emissions(additional_energy, emission_factor)) * DAYS_PER_YEAR
+
+    # # Year 0 carries the construction and maintenance emissions to date, as calculate_fleet() reports them;
+    # # later years add one year of maintenance each
+    to_date = calculate_construction_maintenance_emissions(col["construction_emissions"], col["maintenance_emissions"],
+                                                           col["pipeline_age"])
+    embodied = np.where(years == 0, to_date, col["maintenance_emissions"]) + replacements * col["replacement_emissions"]
+    energy_cost = col["energy_cost"] * energy_price * energy * DAYS_PER_YEAR
+    maintenance_cost = np.broadcast_to(col["maintenance_cost"] * DAYS_PER_YEAR, energy_cost.shape)  # # As in calculate_fleet()
+    replacement_cost = replacements * col["replacement_cost"]
+
+    return {
+        "efficiency": efficiency,
+        "leakage_rate": leakage_rate,
+        "energy_consumption": energy * DAYS_PER_YEAR,
+        "operational_co2_emissions": operational_co2,
+        "embodied_emissions": embodied,
+        "total_co2_emissions": operational_co2 + embodied,
+        "energy_cost": energy_cost,
+        "maintenance_cost": maintenance_cost,
+        "replacement_cost": replacement_cost,
+        "total_cost": energy_cost + maintenance_cost + replacement_cost,
+        "replacements": replacements,
+    }
+
+class LifecycleProjection:
+    # # Year-by-year results for every pump over the horizon. set_parameter() and set_path() only recompute
+    # # the pumps and years they change, and keep the fleet and per-pump totals up to date incrementally.
+    def __init__(self, fleet, horizon=30, start_year=None, grid_factor=None, energy_price=None,
+                 outputs=("energy_consumption", "total_co2_emissions", "total_cost"), block_size=8192):
+        data = {name: fleet[name].to_numpy() for name in fleet.columns} if isinstance(fleet, pd.DataFrame) else fleet
+        col = fleet_columns(data)
+        size = len(col["power_rating"])
+        for name, default in LIFECYCLE_DEFAULTS.items():
+            col[name] = np.broadcast_to(np.asarray(data.get(name, default), dtype=np.float64), (size,))
+        self.columns = {name: np.array(value) for name, value in col.items()}  # # Writable copies
+        self.index = fleet.index if isinstance(fleet, pd.DataFrame) else pd.RangeIndex(size, name="pump")
+        self.horizon = horizon
+        self.years = np.arange(horizon) + (pd.Timestamp.now().year if start_year is None else start_year)
+        self.paths = {
+            "grid_factor": np.ones(horizon) if grid_factor is None else np.array(grid_factor, dtype=np.float64),
+            "energy_price": np.ones(horizon) if energy_price is None else np.array(energy_price, dtype=np.float64),
+        }
+        for name, path in self.paths.items():
+            if path.shape != (horizon,):
+                raise ValueError(f"{name} has shape {path.shape}, expected ({horizon},)")
+        unknown = set(outputs) - set(LIFECYCLE_OUTPUTS)
+        if unknown:
+            raise ValueError(f"Unknown lifecycle outputs {sorted(unknown)}, expected some of {LIFECYCLE_OUTPUTS}")
+        self.outputs = list(outputs)
+        self.block_size = block_size
+
+        self.results = {name: np.zeros((size, horizon)) for name in self.outputs}
+        self.annual_totals = {name: np.zeros(horizon) for name in self.outputs}
+        self.pump_totals = {name: np.zeros(size) for name in self.outputs}
+        self.cells_recomputed = 0
+        self._recompute(np.arange(size), np.arange(horizon))
+
+    def _recompute(self, rows, years):
+        if len(rows) == 0 or len(years) == 0:
+            return 0
+        year_offsets = years[None, :].astype(np.float64)
+        paths = {name: path[years][None, :] for name, path in self.paths.items()}
+        # # Row blocks keep the temporaries small on large fleets
+        for start in range(0, len(rows), self.block_size):
+            block = rows[start:start + self.block_size]
+            cells = np.ix_(block, years)
+            col = {name: value[block, None] for name, value in self.columns.items()}
+            projected = _project(col, year_offsets, **paths)
+            for name in self.outputs:
+                new = np.broadcast_to(projected[name], (len(block), len(years)))
+                delta = new - self.results[name][cells]
+                self.results[name][cells] = new
+                self.annual_totals[name][years] += delta.sum(axis=0)  # # rows and years are unique
+                self.pump_totals[name][block] += delta.sum(axis=1)
+        cells = len(rows) * len(years)
+        self.cells_recomputed += cells
+        return cells
+
+    def set_parameter(self, name, values, pumps=None):
+        # # Change a pump parameter for some (positions) or all pumps; returns the number of cells recomputed
+        if name not in self.columns:
+            raise ValueError(f"Unknown parameter {name!r}, expected one of {sorted(self.columns)}")
+        pumps = np.arange(len(self.index)) if pumps is None else np.asarray(pumps, dtype=np.intp).ravel()
+        column = self.columns[name]
+        values = np.broadcast_to(np.asarray(values, dtype=column.dtype), pumps.shape)
+        changed = pumps[column[pumps] != values]
+        column[pumps] = values
+        return self._recompute(np.unique(changed), np.arange(self.horizon))
+
+    def set_path(self, name, values, years=None):
+        # # Change a fleet-wide path for some (offsets from the start year) or all years
+        if name not in self.paths:
+            raise ValueError(f"Unknown path {name!r}, expected one of {LIFECYCLE_PATHS}")
+        years = np.arange(self.horizon) if years is None else np.asarray(years, dtype=np.intp).ravel()
+        path = self.paths[name]
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64), years.shape)
+        changed = years[path[years] != values]
+        path[years] = values
+        return self._recompute(np.arange(len(self.index)), np.unique(changed))
+
+    def annual(self):
+        # # Fleet totals per year, plus the cumulative CO2 and cost when they are projected
+        annual = pd.DataFrame(self.annual_totals, index=pd.Index(self.years, name="year"))
+        for name in ("total_co2_emissions", "total_cost"):
+            if name in annual:
+                annual[f"cumulative_{name}"] = annual[name].cumsum()
+        return annual
+
+    def totals(self):
+        # # Totals over the horizon for each pump
+        return pd.DataFrame(self.pump_totals, index=self.index)
+
+    def pump(self, position):
+        # # Year-by-year results of one pump
+        return pd.DataFrame({name: values[position] for name, values in self.results.items()},
+                            index=pd.Index(self.years, name="year"))
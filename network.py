@@ -0,0 +1,220 @@
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.linalg import splu
+
+from calculations import (
+    calculate_energy_consumption_normal,
+    calculate_co2_emissions,
+    calculate_reynolds_number,
+    calculate_friction_factor,
+    calculate_friction_loss,
+    pipe_roughness,
+)
+from operating_point import OPERATING_POINT_DEFAULTS, model_curves, duty_point_curves
+
+g = 9.81  # # Gravitational acceleration (m/s²)
+
+## Values used for any column missing from the network tables (flows are in m³/h, as in operating_point.py)
+JUNCTION_DEFAULTS = {"elevation": 0.0, "demand": 0.0}
+PIPE_DEFAULTS = {"material": "PVC", "minor_loss": 0.0}
+PUMP_DEFAULTS = {"speed_ratio": 1.0, **{name: OPERATING_POINT_DEFAULTS[name] for name in (
+    "flow_rate", "head", "best_efficiency", "number_of_stages", "motor_efficiency", "operating_hours", "emission_factor")}}
+
+## Flows below this (m³/s) use a linearized head loss gradient, so closed or stagnant pipes stay solvable
+MIN_GRADIENT_FLOW = 1e-5
+
+## A12ᵀ D⁻¹ A12 is symmetric positive definite, so SuperLU can keep to the diagonal and the symmetric ordering
+SYMMETRIC_LU_OPTIONS = {"diag_pivot_thresh": 0.0, "options": {"SymmetricMode": True}}
+
+## Between these Reynolds numbers the friction factor is interpolated from laminar to turbulent, so that head loss
+## is continuous in the flow; with the sharp switch at 2300 pipes near it make Newton's method cycle
+TRANSITION_REYNOLDS_NUMBERS = (2000.0, 4000.0)
+
+def _table(data, defaults):
+    data = pd.DataFrame(data).copy()
+    if "id" in data:
+        data = data.set_index("id")
+    for name, default in defaults.items():
+        data[name] = data[name].fillna(default) if name in data else default
+    return data
+
+def transitional_friction_factor(reynolds_number, relative_roughness, initial_friction_factor=None):
+    # # Returns the friction factor and the turbulent (Colebrook-White) one, which warm-starts the next call
+    low, high = TRANSITION_REYNOLDS_NUMBERS
+    turbulent = calculate_friction_factor(np.maximum(reynolds_number, high), relative_roughness, initial_friction_factor)
+    share = np.clip((reynolds_number - low) / (high - low), 0.0, 1.0)
+    laminar = 64 / np.minimum(reynolds_number, low)
+    return (1 - share) * laminar + share * turbulent, turbulent
+
+def load_network(path, **kwargs):
+    # # A directory with junctions.csv, reservoirs.csv, pipes.csv and (optionally) pumps.csv
+    def read(name):
+        file = os.path.join(path, f"{name}.csv")
+        return pd.read_csv(file) if os.path.exists(file) else None
+    return PipeNetwork(read("junctions"), read("reservoirs"), read("pipes"), read("pumps"), **kwargs)
+
+class PipeNetwork:
+    # # Steady-state network solved with the global gradient algorithm (Todini & Pilati): Newton's method on
+    # # link flows and junction heads, where each step solves one sparse symmetric system A12ᵀ D⁻¹ A12 for the heads.
+    # # The sparsity pattern and its assembly are built once; later solves (e.g. new demands) only refill values.
+    def __init__(self, junctions, reservoirs, pipes, pumps=None, fluid_density=1000.0, fluid_viscosity=0.001):
+        self.junctions = _table(junctions, JUNCTION_DEFAULTS)
+        self.reservoirs = _table(reservoirs, {})
+        self.pipes = _table(pipes, PIPE_DEFAULTS)
+        self.pumps = _table(pumps if pumps is not None else pd.DataFrame(columns=["id", "from_node", "to_node"]), PUMP_DEFAULTS)
+        self.fluid_density = fluid_density
+        self.fluid_viscosity = fluid_viscosity
+
+        n = len(self.junctions)
+        nodes = self.junctions.index.append(self.reservoirs.index)
+        if nodes.has_duplicates:
+            raise ValueError(f"Duplicate node ids: {list(nodes[nodes.duplicated()])}")
+        links = pd.concat([self.pipes[["from_node", "to_node"]], self.pumps[["from_node", "to_node"]]])
+        start, end = nodes.get_indexer(links["from_node"]), nodes.get_indexer(links["to_node"])
+        unknown = set(links["from_node"][start < 0]) | set(links["to_node"][end < 0])
+        if unknown:
+            raise ValueError(f"Links refer to unknown nodes: {sorted(map(str, unknown))}")
+        self._n, self._pipe_count = n, len(self.pipes)
+
+        # # Incidence of links on junctions (A12) and on fixed-head reservoirs (A10): -1 at the start, +1 at the end
+        rows = np.arange(len(links))
+        a = sp.coo_matrix((np.r_[-np.ones(len(links)), np.ones(len(links))], (np.r_[rows, rows], np.r_[start, end])),
+                          shape=(len(links), len(nodes))).tocsc()
+        self._a12 = a[:, :n].tocsr()
+        self._a21 = self._a12.T.tocsr()
+        self._fixed_head_term = a[:, n:] @ self.reservoirs["head"].to_numpy(dtype=np.float64)
+        self._build_pattern(start, end)
+
+        self._diameter = self.pipes["diameter"].to_numpy(dtype=np.float64)
+        self._length = self.pipes["length"].to_numpy(dtype=np.float64)
+        self._minor_loss = self.pipes["minor_loss"].to_numpy(dtype=np.float64)
+        self._area = np.pi * (self._diameter / 2) ** 2
+        roughness = self.pipes["roughness"] if "roughness" in self.pipes else pipe_roughness(self.pipes["material"].to_numpy())
+        self._relative_roughness = np.asarray(roughness, dtype=np.float64) / self._diameter
+
+        if "pump_model" in self.pumps:
+            self._curves = model_curves(self.pumps["pump_model"].to_numpy())
+        else:
+            self._curves = duty_point_curves(self.pumps["flow_rate"], self.pumps["head"], self.pumps["best_efficiency"], 1.0, 1.0)
+        self._speed = self.pumps["speed_ratio"].to_numpy(dtype=np.float64)
+        self._stages = self.pumps["number_of_stages"].to_numpy(dtype=np.float64)
+
+        self.demands = self.junctions["demand"].to_numpy(dtype=np.float64) / 3600
+        self.flows = np.r_[self._area * 1.0, self.pumps["flow_rate"].to_numpy(dtype=np.float64) / 3600]  # # 1 m/s in every pipe
+        self.heads = np.full(n, self.reservoirs["head"].mean() if len(self.reservoirs) else 0.0)
+        self._friction_factor = self._turbulent_friction_factor = None
+        self.iterations = 0
+
+    def _build_pattern(self, start, end):
+        # # A = A12ᵀ W A12 gets +w on the diagonal of each junction end and -w between two junction ends. Map
+        # # every link's contributions onto the CSC pattern once, so each solve assembles A.data as M @ w.
+        n = self._n
+        both = (start < n) & (end < n)
+        link = np.arange(len(start))
+        rows = np.r_[start[start < n], end[end < n], start[both], end[both]]
+        cols = np.r_[start[start < n], end[end < n], end[both], start[both]]
+        links = np.r_[link[start < n], link[end < n], link[both], link[both]]
+        signs = np.r_[np.ones((start < n).sum() + (end < n).sum()), -np.ones(2 * both.sum())]
+        keys, position = np.unique(cols.astype(np.int64) * n + rows, return_inverse=True)
+        indices = (keys % n).astype(np.int32)
+        indptr = np.r_[0, np.cumsum(np.bincount(keys // n, minlength=n))].astype(np.int32)
+        assembly = sp.csr_matrix((signs, (position, links)), shape=(len(keys), len(start)))
+        if np.any(np.diff(indptr) == 0):
+            raise ValueError("Some junctions are not connected to any link")
+
+        # # The fill-reducing ordering only depends on the pattern, so it is found once, from a diagonally dominant
+        # # matrix with the same pattern. The pattern and assembly are stored in that order, and every solve
+        # # factorizes the already ordered matrix with diagonal pivots, skipping the ordering step.
+        counts = np.diff(indptr)
+        diagonal = indices == np.repeat(np.arange(n), counts)
+        proxy = sp.csc_matrix((np.where(diagonal, np.repeat(counts, counts) + 1.0, -1.0), indices, indptr), shape=(n, n))
+        self._order = np.argsort(splu(proxy, permc_spec="MMD_AT_PLUS_A", **SYMMETRIC_LU_OPTIONS).perm_c)
+        ordered = sp.csc_matrix((np.arange(1.0, len(keys) + 1), indices, indptr), shape=(n, n))[self._order][:, self._order].tocsc()
+        ordered.sort_indices()
+        self._indices, self._indptr = ordered.indices, ordered.indptr
+        self._assembly = assembly[ordered.data.astype(np.intp) - 1]
+
+    def set_demands(self, demands):
+        # # New demands (m³/h per junction); the next solve reuses the pattern and starts from the last solution
+        self.demands = np.broadcast_to(np.asarray(demands, dtype=np.float64), (self._n,)) / 3600
+
+    def _head_losses(self, flows):
+        # # Head loss along every link (start minus end head) and its derivative with respect to the flow
+        pipe_flow, pump_flow = flows[:self._pipe_count], flows[self._pipe_count:] * 3600
+        velocity = np.maximum(np.abs(pipe_flow), MIN_GRADIENT_FLOW) / self._area
+        reynolds_number = calculate_reynolds_number(self.fluid_density, velocity, self._diameter, self.fluid_viscosity)
+        self._friction_factor, self._turbulent_friction_factor = transitional_friction_factor(
+            reynolds_number, self._relative_roughness, self._turbulent_friction_factor)
+        # # Darcy-Weisbach head loss is k Q|Q|, with k the friction loss at unit flow
+        k = calculate_friction_loss(self._length, self._diameter, 1 / self._area, self._friction_factor, self._minor_loss)
+        pipe_loss = k * pipe_flow * np.abs(pipe_flow)
+        pipe_gradient = 2 * k * np.maximum(np.abs(pipe_flow), MIN_GRADIENT_FLOW)
+
+        c = self._curves
+        pump_gain = self._stages * (c["a"] * self._speed ** 2 + c["b"] * self._speed * pump_flow + c["c"] * pump_flow ** 2)
+        pump_gradient = -self._stages * (c["b"] * self._speed + 2 * c["c"] * pump_flow) * 3600
+        return (np.r_[pipe_loss, -pump_gain],
+                np.r_[pipe_gradient, np.maximum(pump_gradient, 1e-6)])
+
+    def solve(self, tolerance=1e-6, max_iterations=50):
+        flows, heads = self.flows.copy(), self.heads.copy()
+        for iteration in range(1, max_iterations + 1):
+            losses, gradient = self._head_losses(flows)
+            weights = 1 / gradient
+            energy_residual = losses + self._a12 @ heads + self._fixed_head_term
+            continuity_residual = self._a21 @ flows - self.demands
+
+            matrix = sp.csc_matrix((self._assembly @ weights, self._indices, self._indptr), shape=(self._n, self._n))
+            head_step = np.empty(self._n)
+            head_step[self._order] = splu(matrix, permc_spec="NATURAL", **SYMMETRIC_LU_OPTIONS).solve(
+                (continuity_residual - self._a21 @ (weights * energy_residual))[self._order])
+            flow_step = -weights * (energy_residual + self._a12 @ head_step)
+            heads += head_step
+            flows += flow_step
+            if np.abs(flow_step).sum() <= tolerance * max(np.abs(flows).sum(), 1e-12):
+                break
+        else:
+            raise RuntimeError(f"Network did not converge in {max_iterations} iterations")
+        self.flows, self.heads, self.iterations = flows, heads, iteration
+        return self.results()
+
+    def results(self):
+        # # Per-junction heads and pressures, per-pipe hydraulics and per-pump duty, power, energy and CO2
+        pipe_flow, pump_flow = self.flows[:self._pipe_count], self.flows[self._pipe_count:] * 3600
+        velocity = np.abs(pipe_flow) / self._area
+        nodes = pd.DataFrame({
+            "head": self.heads,
+            "pressure_head": self.heads - self.junctions["elevation"].to_numpy(dtype=np.float64),
+            "demand": self.demands * 3600,
+        }, index=self.junctions.index)
+        pipes = pd.DataFrame({
+            "flow_rate": pipe_flow * 3600,
+            "velocity": velocity,
+            "reynolds_number": calculate_reynolds_number(self.fluid_density, velocity, self._diameter, self.fluid_viscosity),
+            "friction_factor": self._friction_factor,
+            "friction_loss": calculate_friction_loss(self._length, self._diameter, velocity, self._friction_factor, self._minor_loss),
+        }, index=self.pipes.index)
+
+        c = self._curves
+        head = self._stages * (c["a"] * self._speed ** 2 + c["b"] * self._speed * pump_flow + c["c"] * pump_flow ** 2)
+        scaled_flow = pump_flow / self._speed
+        efficiency = np.clip(c["d"] * scaled_flow + c["e"] * scaled_flow ** 2, 0.0, 100.0)
+        hydraulic_power = self.fluid_density * g * (pump_flow / 3600) * head / 1000  # # kW
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shaft_power = np.where(efficiency > 0, hydraulic_power / (efficiency / 100), 0.0)
+        input_power = shaft_power / (self.pumps["motor_efficiency"].to_numpy(dtype=np.float64) / 100)
+        energy_consumption = calculate_energy_consumption_normal(input_power, self.pumps["operating_hours"].to_numpy(dtype=np.float64))
+        pumps = pd.DataFrame({
+            "flow_rate": pump_flow,
+            "head": head,
+            "efficiency": efficiency,
+            "hydraulic_power": hydraulic_power,
+            "shaft_power": shaft_power,
+            "input_power": input_power,
+            "energy_consumption": energy_consumption,
+            "co2_emissions": calculate_co2_emissions(energy_consumption, self.pumps["emission_factor"].to_numpy(dtype=np.float64)),
+        }, index=self.pumps.index)
+        return {"nodes": nodes, "pipes": pipes, "pumps": pumps}
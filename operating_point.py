@@ -0,0 +1,167 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from calculations import (
+    calculate_energy_consumption_normal,
+    calculate_co2_emissions,
+    calculate_reynolds_number,
+    calculate_friction_factor,
+    pipe_roughness,
+)
+
+g = 9.81  # # Gravitational acceleration (m/s²)
+
+## Manufacturer pump curves: flow (m³/h), head (m) and efficiency (%) at a rated speed and impeller diameter
+PUMP_CURVES = {}
+
+## Values used for any column missing from the fleet data (flow rate and head are the best efficiency point)
+OPERATING_POINT_DEFAULTS = {
+    "flow_rate": 100.0,
+    "head": 30.0,
+    "best_efficiency": 80.0,
+    "pump_speed": 1500.0,
+    "impeller_diameter": 0.2,
+    "number_of_stages": 1.0,
+    "static_head": 20.0,
+    "pipe_length": 500.0,
+    "pipe_diameter": 0.5,
+    "pipe_material": "PVC",
+    "fluid_density": 1000.0,
+    "fluid_viscosity": 0.001,
+    "friction_loss_coefficient": 0.02,
+    "motor_efficiency": 100.0,
+    "operating_hours": 8.0,
+    "emission_factor": 0.000699,
+}
+
+def register_pump_curve(model, flow, head, efficiency, rated_speed, impeller_diameter):
+    PUMP_CURVES[model] = {
+        "flow": np.asarray(flow, dtype=np.float64),
+        "head": np.asarray(head, dtype=np.float64),
+        "efficiency": np.asarray(efficiency, dtype=np.float64),
+        "rated_speed": float(rated_speed),
+        "impeller_diameter": float(impeller_diameter),
+    }
+    fit_pump_curve.cache_clear()
+
+@lru_cache(maxsize=None)
+def fit_pump_curve(model):
+    # # Least-squares fits, H(Q) = a + bQ + cQ² and eta(Q) = dQ + eQ², cached per pump model
+    try:
+        curve = PUMP_CURVES[model]
+    except KeyError:
+        raise ValueError(f"Unknown pump model {model!r}; register it with register_pump_curve()") from None
+    c, b, a = np.polyfit(curve["flow"], curve["head"], 2)
+    (d, e), *_ = np.linalg.lstsq(np.column_stack([curve["flow"], curve["flow"] ** 2]), curve["efficiency"], rcond=None)
+    return (a, b, c, d, e, curve["rated_speed"], curve["impeller_diameter"])
+
+def model_curves(models):
+    models, inverse = np.unique(np.asarray(models, dtype=str), return_inverse=True)
+    fits = np.array([fit_pump_curve(str(model)) for model in models])[inverse]
+    return dict(zip(["a", "b", "c", "d", "e", "rated_speed", "rated_impeller_diameter"], fits.T))
+
+def duty_point_curves(flow_rate, head, best_efficiency, rated_speed, impeller_diameter):
+    # # Generic curve through a best efficiency point: shut-off head 1.25 x head, efficiency peaking at flow_rate
+    flow_rate, head, best_efficiency = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in
+                                                             (flow_rate, head, best_efficiency)))
+    return {
+        "a": 1.25 * head,
+        "b": np.zeros_like(head),
+        "c": -0.25 * head / flow_rate ** 2,
+        "d": 2 * best_efficiency / flow_rate,
+        "e": -best_efficiency / flow_rate ** 2,
+        "rated_speed": np.broadcast_to(np.asarray(rated_speed, dtype=np.float64), head.shape),
+        "rated_impeller_diameter": np.broadcast_to(np.asarray(impeller_diameter, dtype=np.float64), head.shape),
+    }
+
+def system_curve_coefficient(pipe_length, pipe_diameter, friction_factor, friction_loss_coefficient):
+    # # k in H = static_head + k Q², with Q in m³/h
+    area = np.pi * (pipe_diameter / 2) ** 2
+    return (friction_factor * pipe_length / pipe_diameter + friction_loss_coefficient) / (2 * g * (area * 3600) ** 2)
+
+def solve_operating_point(curves, static_head, system_coefficient, pump_speed, impeller_diameter, number_of_stages=1):
+    # # Affinity laws: with s = (n/n0)(D/D0), flow scales with s and head with s², so the pump curve becomes
+    # # H = stages (a s² + b s Q + c Q²); intersecting it with the system curve is one quadratic per pump
+    s = (pump_speed / curves["rated_speed"]) * (impeller_diameter / curves["rated_impeller_diameter"])
+    qa = number_of_stages * curves["c"] - system_coefficient
+    qb = number_of_stages * curves["b"] * s
+    qc = number_of_stages * curves["a"] * s ** 2 - static_head
+    discriminant = qb ** 2 - 4 * qa * qc
+    with np.errstate(invalid="ignore", divide="ignore"):
+        flow = (-qb - np.sqrt(discriminant)) / (2 * qa)
+    # # No operating point when the pump cannot overcome the static head
+    feasible = (discriminant >= 0) & (flow > 0)
+    flow = np.where(feasible, flow, 0.0)
+    head = static_head + system_coefficient * flow ** 2
+    efficiency = curves["d"] * flow / s + curves["e"] * (flow / s) ** 2
+    return flow, np.where(feasible, head, 0.0), np.clip(efficiency, 0.0, 100.0), feasible
+
+def _fleet_columns(data):
+    if isinstance(data, pd.DataFrame):
+        data = {name: data[name].to_numpy() for name in data.columns}
+    sizes = {np.size(value) for value in data.values() if np.ndim(value) > 0}
+    if len(sizes) > 1:
+        raise ValueError(f"Fleet columns have different lengths: {sorted(sizes)}")
+    size = sizes.pop() if sizes else 1
+    col = {name: np.broadcast_to(np.asarray(data.get(name, default), dtype=np.float64), (size,))
+           for name, default in OPERATING_POINT_DEFAULTS.items() if name != "pipe_material"}
+    col["pipe_roughness"] = np.broadcast_to(pipe_roughness(data.get("pipe_material", "PVC")), (size,))
+    if "pump_model" in data:
+        col["curves"] = {name: np.broadcast_to(value, (size,)) for name, value in model_curves(data["pump_model"]).items()}
+    else:
+        col["curves"] = duty_point_curves(col["flow_rate"], col["head"], col["best_efficiency"],
+                                          data.get("rated_speed", col["pump_speed"]),
+                                          data.get("rated_impeller_diameter", col["impeller_diameter"]))
+    return col
+
+def calculate_operating_points(fleet, iterations=3):
+    col = _fleet_columns(fleet)
+    area = np.pi * (col["pipe_diameter"] / 2) ** 2
+    relative_roughness = col["pipe_roughness"] / col["pipe_diameter"]
+
+    # # The friction factor depends on the flow, so re-solve a few times, warm-starting Colebrook-White each time
+    friction_factor = np.full(col["pipe_diameter"].shape, 0.02)
+    flow = col["flow_rate"]
+    for _ in range(iterations):
+        velocity = np.maximum(flow, 1e-6) / 3600 / area
+        reynolds_number = calculate_reynolds_number(col["fluid_density"], velocity, col["pipe_diameter"], col["fluid_viscosity"])
+        friction_factor = calculate_friction_factor(reynolds_number, relative_roughness, friction_factor)
+        system_coefficient = system_curve_coefficient(col["pipe_length"], col["pipe_diameter"], friction_factor,
+                                                      col["friction_loss_coefficient"])
+        flow, head, efficiency, feasible = solve_operating_point(
+            col["curves"], col["static_head"], system_coefficient, col["pump_speed"], col["impeller_diameter"],
+            col["number_of_stages"])
+
+    hydraulic_power = col["fluid_density"] * g * (flow / 3600) * head / 1000  # # kW
+    with np.errstate(invalid="ignore", divide="ignore"):
+        shaft_power = np.where(feasible & (efficiency > 0), hydraulic_power / (efficiency / 100), 0.0)
+    input_power = shaft_power / (col["motor_efficiency"] / 100)
+    energy_consumption = calculate_energy_consumption_normal(input_power, col["operating_hours"])
+
+    index = fleet.index if isinstance(fleet, pd.DataFrame) else None
+    return pd.DataFrame({
+        "operating_flow_rate": flow,
+        "operating_head": head,
+        "operating_efficiency": efficiency,
+        "feasible": feasible,
+        "hydraulic_power": hydraulic_power,
+        "shaft_power": shaft_power,
+        "input_power": input_power,
+        "energy_consumption": energy_consumption,
+        "co2_emissions": calculate_co2_emissions(energy_consumption, col["emission_factor"]),
+    }, index=index)
+
+def speed_study(fleet, speed_ratios):
+    # # Operating points of every pump at every speed ratio (e.g. VFD settings), in one batched solve
+    fleet = pd.DataFrame(fleet) if not isinstance(fleet, pd.DataFrame) else fleet
+    speed_ratios = np.asarray(speed_ratios, dtype=np.float64)
+    # # By position, as a label shared by several pumps would select all of them for each repeat
+    repeated = fleet.iloc[np.repeat(np.arange(len(fleet)), len(speed_ratios))].reset_index(names="pump")
+    speed = repeated["pump_speed"] if "pump_speed" in repeated else OPERATING_POINT_DEFAULTS["pump_speed"]
+    repeated["rated_speed"] = repeated["rated_speed"] if "rated_speed" in repeated else speed
+    repeated["speed_ratio"] = np.tile(speed_ratios, len(fleet))
+    repeated["pump_speed"] = speed * repeated["speed_ratio"]
+    results = calculate_operating_points(repeated)
+    return pd.concat([repeated[["pump", "speed_ratio", "pump_speed"]], results], axis=1)
@@ -0,0 +1,69 @@
+import hashlib
+
+import pandas as pd
+import streamlit as st
+
+from network import PipeNetwork
+
+TABLES = {
+    "junctions": "Junctions (id, elevation, demand in m³/h)",
+    "reservoirs": "Reservoirs (id, head in m)",
+    "pipes": "Pipes (id, from_node, to_node, length, diameter, material, minor_loss)",
+    "pumps": "Pumps (id, from_node, to_node, flow_rate, head, best_efficiency, speed_ratio, ...)",
+}
+
+# Function to build the network once per set of uploaded files and keep it for the session
+def session_network(files):
+    digest = hashlib.sha256(b"".join(file.getvalue() for file in files.values() if file is not None)).hexdigest()
+    if st.session_state.get("network_digest") != digest:
+        tables = {name: pd.read_csv(file) if file is not None else None for name, file in files.items()}
+        st.session_state["network"] = PipeNetwork(**tables)
+        st.session_state["network_digest"] = digest
+    return st.session_state["network"]
+
+# Main function for rendering the network analysis page
+def main():
+    st.title("Network Analysis")
+    st.write("Solve flows and heads in a pipe network with several pumps and reservoirs, "
+             "and see the energy and CO2 of every pump at its operating point.")
+
+    st.sidebar.header("Network Files")
+    files = {name: st.sidebar.file_uploader(label, type="csv", key=f"network_{name}") for name, label in TABLES.items()}
+    if files["junctions"] is None or files["reservoirs"] is None or files["pipes"] is None:
+        st.info("Upload at least the junctions, reservoirs and pipes CSV files in the sidebar.")
+        return
+
+    try:
+        network = session_network(files)
+    except (KeyError, ValueError) as e:
+        st.error(f"Could not load the network: {e}")
+        return
+
+    demand_factor = st.sidebar.slider("Demand Multiplier (%)", min_value=10, max_value=200, value=100, step=5,
+                                      help="Scales every junction demand; the network is re-solved from the last solution.",
+                                      key="network_demand_factor")
+    network.set_demands(network.junctions["demand"].to_numpy() * demand_factor / 100)
+    try:
+        results = network.solve()
+    except RuntimeError as e:
+        st.error(str(e))
+        return
+
+    st.markdown(f"Solved {len(network.junctions):,} junctions and {len(network.pipes):,} pipes in {network.iterations} iterations.")
+
+    st.header("Pumps")
+    pumps = results["pumps"]
+    st.dataframe(pumps.round(3))
+    st.markdown(f"Total Energy Consumption: {pumps['energy_consumption'].sum():.2f} kWh/day")
+    st.markdown(f"Total CO2 Emissions: {pumps['co2_emissions'].sum():.4f} metric tons/day")
+
+    st.header("Junctions")
+    nodes = results["nodes"]
+    st.markdown(f"Pressure head ranges from {nodes['pressure_head'].min():.2f} m to {nodes['pressure_head'].max():.2f} m.")
+    st.dataframe(nodes.sort_values("pressure_head").round(3))
+
+    st.header("Pipes")
+    st.dataframe(results["pipes"].round(4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from charts import bar_chart, line_chart
+from hourly import HOURS_PER_DAY
+from scheduling import PumpScheduler
+
+## Typical diurnal water demand relative to the daily average (morning and evening peaks)
+DEMAND_SHAPE = np.array([0.5, 0.5, 0.5, 0.5, 0.5, 0.7, 1.1, 1.5, 1.5, 1.3, 1.2, 1.1,
+                         1.1, 1.0, 1.0, 1.0, 1.1, 1.3, 1.5, 1.4, 1.2, 1.0, 0.8, 0.7])
+
+# Function to build the scheduler once per set of uploaded files and speed ratios and keep it for the session
+def session_scheduler(pumps_file, tanks_file, speed_ratios):
+    digest = hashlib.sha256(pumps_file.getvalue() + tanks_file.getvalue() + repr(speed_ratios).encode()).hexdigest()
+    if st.session_state.get("scheduler_digest") != digest:
+        tanks = pd.read_csv(tanks_file)
+        st.session_state["scheduler"] = PumpScheduler(pd.read_csv(pumps_file), tanks, speed_ratios)
+        st.session_state["scheduler_demand"] = tanks.set_index("tank")["demand"]
+        st.session_state["scheduler_digest"] = digest
+        st.session_state["scheduler_day"] = 1
+        st.session_state["scheduler_start"] = st.session_state["scheduler"].state()
+    return st.session_state["scheduler"], st.session_state["scheduler_demand"]
+
+# Main function for rendering the pump scheduling page
+def main():
+    st.title("Pump Scheduling")
+    st.write("Choose when each pump runs, and at which speed, so the tanks meet the demand at the lowest "
+             "energy cost plus a price on CO2, shifting pumping to cheap and clean hours.")
+
+    st.sidebar.header("Scheduling Files")
+    pumps_file = st.sidebar.file_uploader("Pumps (tank, flow_rate, head, static_head, ...)", type="csv",
+                                          key="scheduling_pumps")
+    tanks_file = st.sidebar.file_uploader("Tanks (tank, demand in m³/h, min_volume, max_volume, initial_volume)",
+                                          type="csv", key="scheduling_tanks")
+    if pumps_file is None or tanks_file is None:
+        st.info("Upload the pumps and tanks CSV files in the sidebar.")
+        return
+
+    speed_ratios = st.sidebar.multiselect("Speed Settings (%)", [60, 70, 80, 90, 100], default=[100],
+                                          help="Settings a pump can run at besides off.", key="scheduling_speeds")
+    if not speed_ratios:
+        st.warning("Choose at least one speed setting.")
+        return
+    try:
+        scheduler, demand = session_scheduler(pumps_file, tanks_file, tuple(sorted(r / 100 for r in speed_ratios)))
+    except (KeyError, ValueError) as e:
+        st.error(f"Could not set up the schedule: {e}")
+        return
+
+    st.sidebar.header("Tariff")
+    off_peak = st.sidebar.number_input("Off-Peak Price (currency/kWh)", min_value=0.0, value=0.08, step=0.01,
+                                       key="scheduling_off_peak")
+    peak = st.sidebar.number_input("Peak Price (currency/kWh)", min_value=0.0, value=0.25, step=0.01,
+                                   key="scheduling_peak")
+    peak_hours = st.sidebar.slider("Peak Hours", min_value=0, max_value=HOURS_PER_DAY, value=(7, 22),
+                                   key="scheduling_peak_hours")
+    co2_weight = st.sidebar.number_input("CO2 Price (currency/metric ton)", min_value=0.0, value=0.0, step=10.0,
+                                         help="Weight of CO2 against cost in the objective.", key="scheduling_co2_weight")
+    intensity_file = st.sidebar.file_uploader("Hourly Grid Intensity (metric tons CO2/kWh, 24 values)", type="csv",
+                                              key="scheduling_intensity")
+
+    hours = np.arange(HOURS_PER_DAY)
+    tariff = np.where((hours >= peak_hours[0]) & (hours < peak_hours[1]), peak, off_peak)
+    intensity = None
+    if intensity_file is not None:
+        intensity = pd.read_csv(intensity_file).iloc[:, -1].to_numpy(dtype=np.float64)
+        if intensity.shape != (HOURS_PER_DAY,):
+            st.error(f"The grid intensity file has {len(intensity)} values, expected {HOURS_PER_DAY}.")
+            return
+
+    # # The day shown is re-solved from its start state whenever an input changes; Next Day continues from
+    # # its end volumes and reuses its value function as the end-of-day value
+    col1, col2 = st.columns(2)
+    if col1.button("Restart Day 1", key="scheduling_restart"):
+        scheduler.reset()
+        st.session_state["scheduler_day"] = 1
+        st.session_state["scheduler_start"] = scheduler.state()
+    if col2.button("Next Day", key="scheduling_next_day"):
+        st.session_state["scheduler_day"] += 1
+        st.session_state["scheduler_start"] = st.session_state["scheduler_end"]
+
+    scheduler.restore(st.session_state["scheduler_start"])
+    try:
+        result = scheduler.solve_day(np.outer(demand.reindex(scheduler.tanks.index).to_numpy(), DEMAND_SHAPE),
+                                     tariff, intensity, co2_weight)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    st.session_state["scheduler_end"] = scheduler.state()
+
+    hourly = result["hourly"]
+    st.header(f"Day {st.session_state['scheduler_day']}")
+    st.markdown(f"Energy Consumption: {hourly['energy_consumption'].sum():.2f} kWh/day")
+    st.markdown(f"Energy Cost: {hourly['energy_cost'].sum():.2f} currency units/day")
+    st.markdown(f"CO2 Emissions: {hourly['co2_emissions'].sum():.4f} metric tons/day")
+    bar_chart(hourly["energy_consumption"])
+
+    st.header("Pump Settings")
+    st.dataframe(result["settings"])
+
+    st.header("Tank Volumes (m³)")
+    line_chart(result["volumes"].T)
+
+if __name__ == "__main__":
+    main()
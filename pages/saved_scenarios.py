@@ -0,0 +1,80 @@
+import io
+
+import streamlit as st
+
+from charts import bar_chart
+from scenarios import SUMMARY_COLUMNS, get_scenario_store
+
+SUMMARY_LABELS = {
+    "energy_consumption": "Energy Consumption (kWh/day)",
+    "total_co2_emissions": "Total CO2 Emissions (metric tons/day)",
+    "total_cost": "Total Annual Cost (currency units)",
+}
+
+ORDER_LABELS = {"last_used": "Recently Used", "created": "Recently Saved", "name": "Name",
+                **{name: SUMMARY_LABELS[name] for name in SUMMARY_COLUMNS}}
+
+# Function for exporting and importing scenario files in the sidebar
+def import_export(store):
+    st.sidebar.header("Import / Export")
+    # # The export is only built on request, not on every rerun
+    if st.sidebar.button("Export Scenarios", key="scenario_export", help="One JSON scenario per line."):
+        buffer = io.StringIO()
+        count = store.export_scenarios(buffer)
+        st.sidebar.download_button(f"Download {count} Scenarios", buffer.getvalue(), file_name="scenarios.jsonl",
+                                   mime="application/jsonl", on_click="ignore")
+
+    uploaded = st.sidebar.file_uploader("Import Scenarios", type=["jsonl", "json"], key="scenario_import",
+                                        help="A file from Export Scenarios. Scenarios already stored are kept.")
+    if uploaded is not None and st.sidebar.button("Import", key="scenario_import_button"):
+        try:
+            count = store.import_scenarios(io.StringIO(uploaded.getvalue().decode()))
+        except (ValueError, KeyError) as e:
+            st.sidebar.error(f"Could not import scenarios: {e}")
+        else:
+            st.sidebar.success(f"Imported {count} scenarios.")
+
+# Main function for rendering the saved scenarios page
+def main():
+    st.title("Saved Scenarios")
+    st.write("Scenarios saved from the calculator, with their stored results. Opening or comparing them does not recalculate.")
+
+    store = get_scenario_store()
+    import_export(store)
+
+    order_by = st.sidebar.selectbox("Sort By", list(ORDER_LABELS), format_func=ORDER_LABELS.get, key="scenario_order")
+    limit = st.sidebar.number_input("Scenarios Shown", min_value=10, max_value=100_000, value=1000, step=100,
+                                    key="scenario_limit")
+    scenarios = store.list_scenarios(int(limit), order_by)
+    if scenarios.empty:
+        st.info("No saved scenarios yet. Use Save Scenario in the calculator's sidebar.")
+        return
+
+    st.header(f"Scenarios ({len(store)} stored)")
+    st.dataframe(scenarios.rename(columns=SUMMARY_LABELS))
+
+    labels = {key: f"{name} ({key[:8]})" for key, name in scenarios["name"].items()}
+
+    st.header("Open Scenario")
+    key = st.selectbox("Scenario", list(labels), format_func=labels.get, key="scenario_open")
+    stored = store.get(key)
+    if stored is not None:
+        name, inputs, results = stored
+        col1, col2 = st.columns(2)
+        col1.subheader("Inputs")
+        col1.dataframe({"Value": {name: str(value) for name, value in inputs.items()}})
+        col2.subheader("Results")
+        col2.dataframe({"Value": results})
+
+    st.header("Compare Scenarios")
+    keys = st.multiselect("Scenarios", list(labels), format_func=labels.get, key="scenario_compare")
+    if keys:
+        comparison = store.compare(keys)
+        st.dataframe(comparison.astype(str))
+        numeric = comparison.loc[SUMMARY_COLUMNS].astype(float).rename(index=SUMMARY_LABELS)
+        for label, values in numeric.iterrows():
+            st.subheader(label)
+            bar_chart(values)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+
+import streamlit as st
+
+from calculations import PIPE_ROUGHNESS
+from charts import binned_summary, histogram_chart
+from uncertainty import affected_outputs, run_monte_carlo, summarize
+
+## Every numeric input, by sidebar section: name -> (label, default, step)
+UNCERTAIN_INPUTS = {
+    "Pump": {
+        "power_rating": ("Power Rating (kW)", 100.0, 1.0),
+        "operating_hours": ("Operating Hours per Day", 8.0, 0.5),
+        "efficiency": ("Pump Efficiency (%)", 80.0, 1.0),
+        "mechanical_efficiency": ("Mechanical Efficiency (%)", 90.0, 1.0),
+        "leakage_rate": ("Leakage Rate (%)", 0.0, 1.0),
+        "pressure_boost": ("Pressure Boost (bar)", 2.0, 0.1),
+        "static_head": ("Static Head (m)", 50.0, 1.0),
+        "dynamic_head": ("Dynamic Head (m)", 10.0, 1.0),
+    },
+    "Pipe and Fluid": {
+        "pipe_length": ("Pipe Length (m)", 500.0, 10.0),
+        "pipe_diameter": ("Pipe Diameter (m)", 0.5, 0.01),
+        "flow_velocity": ("Flow Velocity (m/s)", 2.0, 0.1),
+        "friction_loss_coefficient": ("Friction Loss Coefficient", 0.02, 0.001),
+        "fluid_density": ("Fluid Density (kg/m³)", 1000.0, 10.0),
+        "fluid_viscosity": ("Fluid Viscosity (Pa·s)", 0.001, 0.0001),
+    },
+    "Emissions and Cost": {
+        "emission_factor": ("CO2 Emission Factor (metric tons per kWh)", 0.000699, 0.00001),
+        "construction_emissions": ("Construction Emissions (metric tons)", 500.0, 10.0),
+        "maintenance_emissions": ("Maintenance Emissions (metric tons/year)", 10.0, 1.0),
+        "pipeline_age": ("Pipeline Age (years)", 10.0, 1.0),
+        "energy_cost": ("Energy Cost (currency/kWh)", 0.1, 0.01),
+        "maintenance_cost": ("Maintenance Cost (currency/year)", 1000.0, 10.0),
+    },
+}
+
+OUTPUT_LABELS = {
+    "daily_co2": "Daily CO2 Emissions (metric tons/day)",
+    "annual_co2": "Annual CO2 Emissions (metric tons/year)",
+    "annual_cost": "Total Annual Cost (currency units)",
+    "friction_loss": "Friction Loss (m)",
+}
+
+# Function to collect the distribution for one input from the sidebar
+def distribution_input(name, label, default, step):
+    kind = st.sidebar.selectbox(label, ["Fixed", "Normal", "Uniform", "Triangular", "Lognormal"], key=f"{name}_distribution")
+    fmt = "%.6f" if 0 < default < 0.01 else "%.2f"
+    if kind == "Fixed":
+        return st.sidebar.number_input(f"{label}: value", value=default, step=step, format=fmt, key=f"{name}_value")
+    if kind == "Normal":
+        col1, col2 = st.sidebar.columns(2)
+        mean = col1.number_input("Mean", value=default, step=step, format=fmt, key=f"{name}_mean")
+        std = col2.number_input("Std. Dev.", min_value=0.0, value=default * 0.1, step=step, format=fmt, key=f"{name}_std")
+        return ("normal", mean, std)
+    if kind == "Uniform":
+        col1, col2 = st.sidebar.columns(2)
+        low = col1.number_input("Low", value=default * 0.9, step=step, format=fmt, key=f"{name}_low")
+        high = col2.number_input("High", value=default * 1.1, step=step, format=fmt, key=f"{name}_high")
+        return ("uniform", low, max(low, high))
+    if kind == "Lognormal":
+        col1, col2 = st.sidebar.columns(2)
+        median = col1.number_input("Median", min_value=0.0, value=default, step=step, format=fmt, key=f"{name}_median")
+        sigma = col2.number_input("Sigma (log)", min_value=0.0, value=0.1, step=0.01, key=f"{name}_sigma",
+                                  help="Standard deviation of the logarithm; 0.1 is about ±10%.")
+        return ("lognormal", median, sigma) if median > 0 else 0.0
+    col1, col2, col3 = st.sidebar.columns(3)
+    low = col1.number_input("Low", value=default * 0.9, step=step, format=fmt, key=f"{name}_tri_low")
+    mode = col2.number_input("Mode", value=default, step=step, format=fmt, key=f"{name}_tri_mode")
+    high = col3.number_input("High", value=default * 1.1, step=step, format=fmt, key=f"{name}_tri_high")
+    low, high = min(low, mode), max(high, mode)
+    return ("triangular", low, mode, high) if high > low else mode
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_monte_carlo(inputs, distributions, n_samples, seed, workers):
+    results = run_monte_carlo(inputs, distributions, n_samples, seed=seed, workers=workers)
+    return summarize(results), {name: binned_summary(values) for name, values in results.items()}
+
+# Main function for rendering the uncertainty page
+def main():
+    st.title("Uncertainty Analysis")
+    st.write("Give any input a distribution to see the spread of CO2 emissions, cost and friction loss it produces.")
+
+    st.sidebar.title("Input Distributions")
+    pump_type = st.sidebar.radio("Select Pump Type", ["Normal Pump", "Booster Pump"], key="uncertainty_pump_type")
+
+    pipe_material = st.sidebar.selectbox("Pipe Material", list(PIPE_ROUGHNESS), key="uncertainty_pipe_material")
+
+    inputs = {"pump_type": "Booster Pump" if pump_type == "Booster Pump" else "Water Distribution Pumps",
+              "pipe_material": pipe_material}
+    distributions = {}
+    for section, section_inputs in UNCERTAIN_INPUTS.items():
+        st.sidebar.header(section)
+        for name, (label, default, step) in section_inputs.items():
+            if name == "pressure_boost" and pump_type != "Booster Pump":
+                continue
+            spec = distribution_input(name, label, default, step)
+            if isinstance(spec, tuple):
+                distributions[name] = spec
+            else:
+                inputs[name] = spec
+
+    st.sidebar.header("Simulation")
+    n_samples = st.sidebar.number_input("Number of Samples", min_value=1000, max_value=10_000_000, value=1_000_000, step=100_000,
+                                        help="Samples are simulated in memory-bounded blocks.")
+    seed = st.sidebar.number_input("Random Seed", min_value=0, value=42, help="The same seed reproduces the same results.")
+    workers = st.sidebar.number_input("Worker Processes", min_value=1, max_value=os.cpu_count() or 1, value=1,
+                                      help="Spread the sample blocks over several processes.")
+
+    if not distributions:
+        st.info("All inputs are fixed. Choose a distribution for at least one input in the sidebar.")
+        return
+
+    outputs = affected_outputs(distributions)
+    unaffected = [OUTPUT_LABELS[name] for name in OUTPUT_LABELS if name not in outputs]
+    if not outputs:
+        st.info(f"None of the inputs with a distribution affect {', '.join(unaffected)}.")
+        return
+
+    with st.spinner(f"Simulating {n_samples:,} samples..."):
+        summary, histograms = cached_monte_carlo(inputs, distributions, int(n_samples), int(seed), int(workers))
+
+    st.header("Percentiles")
+    st.dataframe(summary.rename(index=OUTPUT_LABELS))
+    if unaffected:
+        st.caption(f"Not affected by the inputs with a distribution: {', '.join(unaffected)}.")
+
+    st.header("Distributions")
+    for name in outputs:
+        st.subheader(OUTPUT_LABELS[name])
+        if len(histograms[name]) == 1:  # # No spread: every sample gave the same value
+            st.markdown(f"Constant: {histograms[name].index[0]:.6g}")
+        else:
+            histogram_chart(histograms[name])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import logging
+import os
+import time
+
+logger = logging.getLogger("pump_calculator.profiling")
+
+## Set this environment variable (or add ?profile=1 to the app URL) to record stage timings
+PROFILE_ENV_VAR = "PUMP_CALCULATOR_PROFILE"
+
+## Stages of one app rerun
+STAGES = ["Input Parsing", "Calculation", "DataFrame Building", "Results Output", "Chart Rendering"]
+
+def profiling_enabled(query_params=None):
+    if os.environ.get(PROFILE_ENV_VAR, "").lower() in ("1", "true", "yes"):
+        return True
+    return query_params is not None and query_params.get("profile", "") in ("1", "true", "yes")
+
+class StageTimer:
+    # # lap(stage) charges the time since the previous lap to stage; when disabled every call is a no-op
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.timings = {stage: 0.0 for stage in STAGES}
+        self._last = time.perf_counter()
+
+    def lap(self, stage):
+        if self.enabled:
+            now = time.perf_counter()
+            self.timings[stage] = self.timings.get(stage, 0.0) + now - self._last
+            self._last = now
+
+    def total(self):
+        return sum(self.timings.values())
+
+    def log(self):
+        if self.enabled:
+            stages = ", ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in self.timings.items())
+            logger.info("rerun %.1fms: %s", self.total() * 1000, stages)
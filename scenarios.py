@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from calculations import CALCULATION_VERSION
+from fleet import FLEET_DEFAULTS, FLEET_RESULT_COLUMNS, TEXT_COLUMNS, calculate_fleet_arrays
+
+## Database file used when no path is given
+SCENARIO_DB_ENV_VAR = "PUMP_CALCULATOR_SCENARIO_DB"
+DEFAULT_SCENARIO_DB = "scenarios.db"
+
+## Least recently used scenarios are evicted once the stored inputs and results exceed this many bytes
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+## Results kept in their own columns so listing and sorting never parse the stored JSON
+SUMMARY_COLUMNS = ["energy_consumption", "total_co2_emissions", "total_cost"]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS scenarios (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    results TEXT NOT NULL,
+    {"".join(f"{name} REAL, " for name in SUMMARY_COLUMNS)}
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenarios_last_used ON scenarios (last_used);
+"""
+
+def normalize_inputs(inputs):
+    # # Fill in defaults and round away floating point noise, so equivalent inputs get the same key
+    normalized = dict(FLEET_DEFAULTS)
+    normalized.update(inputs)
+    for name, value in normalized.items():
+        if name not in TEXT_COLUMNS:
+            normalized[name] = round(float(value), 9)
+    if normalized["pump_type"] != "Booster Pump":
+        normalized["pressure_boost"] = 0.0  # # Has no effect on a normal pump
+    return normalized
+
+def scenario_key(inputs):
+    # # Results of another calculation version are stale, so the version is part of the key
+    text = json.dumps(normalize_inputs(inputs), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{CALCULATION_VERSION}:{text}".encode()).hexdigest()
+
+def calculate_scenario(inputs):
+    results = calculate_fleet_arrays(normalize_inputs(inputs))
+    return {name: float(results[name][0]) for name in FLEET_RESULT_COLUMNS}
+
+class ScenarioStore:
+    # # SQLite store of scenarios keyed by scenario_key(); safe to share between Streamlit sessions
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or os.environ.get(SCENARIO_DB_ENV_VAR, DEFAULT_SCENARIO_DB)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM scenarios").fetchone()[0]
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM scenarios WHERE key = ?", (key,)).fetchone() is not None
+
+    def size(self):
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM scenarios").fetchone()[0]
+
+    def _row(self, key, name, inputs, results, created, last_used):
+        inputs_json = json.dumps(inputs, sort_keys=True)
+        results_json = json.dumps(results, sort_keys=True)
+        size = sum(len(text.encode()) for text in (key, name, inputs_json, results_json))
+        return (key, name, inputs_json, results_json, *(results.get(c) for c in SUMMARY_COLUMNS), size, created, last_used)
+
+    def _insert(self, rows, replace):
+        # # Returns the number of rows written; rows skipped by INSERT OR IGNORE are not counted
+        placeholders = ", ".join("?" * (len(SUMMARY_COLUMNS) + 7))
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                written = self._db.executemany(f"{verb} INTO scenarios VALUES ({placeholders})", rows).rowcount
+                self._evict()
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return written
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM scenarios").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._db.execute("SELECT key, size FROM scenarios ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM scenarios WHERE key = ?", evicted)
+
+    def put(self, inputs, results=None, name=None):
+        # # Returns the key; saving the same inputs again updates the name in place, and the results are only
+        # # calculated when none are given or stored under this key (which includes the calculation version)
+        inputs = normalize_inputs(inputs)
+        key = scenario_key(inputs)
+        if results is None:
+            stored = self.get(key)
+            results = calculate_scenario(inputs) if stored is None else stored[2]
+        results = {c: float(v) for c, v in results.items()}
+        now = time.time()
+        self._insert([self._row(key, name or key[:12], inputs, results, now, now)], replace=True)
+        return key
+
+    def get(self, key):
+        # # (name, inputs, results) of a stored scenario, or None; marks it as recently used
+        with self._lock:
+            row = self._db.execute("SELECT name, inputs, results FROM scenarios WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE scenarios SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0], json.loads(row[1]), json.loads(row[2])
+
+    def results(self, inputs):
+        # # Stored results for these inputs, calculating and storing them only on a miss
+        key = scenario_key(inputs)
+        stored = self.get(key)
+        if stored is not None:
+            return stored[2]
+        results = calculate_scenario(inputs)
+        self.put(inputs, results)
+        return results
+
+    def delete(self, key):
+        with self._lock:
+            self._db.execute("DELETE FROM scenarios WHERE key = ?", (key,))
+
+    def list_scenarios(self, limit=None, order_by="last_used"):
+        # # One row per scenario with its summary results, most recently used (or largest value) first
+        if order_by not in ("last_used", "created", "name", *SUMMARY_COLUMNS):
+            raise ValueError(f"Cannot order scenarios by {order_by!r}")
+        direction = "ASC" if order_by == "name" else "DESC"
+        query = (f"SELECT key, name, {', '.join(SUMMARY_COLUMNS)}, created, last_used FROM scenarios "
+                 f"ORDER BY {order_by} {direction} LIMIT ?")
+        with self._lock:
+            scenarios = pd.read_sql_query(query, self._db, params=(-1 if limit is None else limit,))
+        for column in ("created", "last_used"):
+            scenarios[column] = pd.to_datetime(scenarios[column], unit="s")
+        return scenarios.set_index("key")
+
+    def compare(self, keys):
+        # # Inputs and results side by side, one column per scenario
+        with self._lock:
+            rows = []
+            for start in range(0, len(keys), 500):  # # Stay under SQLite's bound parameter limit
+                chunk = list(keys[start:start + 500])
+                rows += self._db.execute(f"SELECT key, name, inputs, results FROM scenarios "
+                                         f"WHERE key IN ({', '.join('?' * len(chunk))})", chunk).fetchall()
+        found = {key: (name, inputs, results) for key, name, inputs, results in rows}
+        missing = [key for key in keys if key not in found]
+        if missing:
+            raise KeyError(f"Unknown scenarios: {missing}")
+        columns = {}
+        for key in keys:
+            name, inputs, results = found[key]
+            columns[f"{name} ({key[:8]})"] = pd.Series({**json.loads(inputs), **json.loads(results)}, dtype=object)
+        return pd.DataFrame(columns)
+
+    def export_scenarios(self, file):
+        # # One JSON object per line; file is a path or a text file object
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "w") as f:
+                return self.export_scenarios(f)
+        with self._lock:
+            rows = self._db.execute("SELECT key, name, inputs, results, created, last_used FROM scenarios "
+                                    "ORDER BY created").fetchall()
+        for key, name, inputs, results, created, last_used in rows:
+            file.write(f'{{"key": "{key}", "name": {json.dumps(name)}, "inputs": {inputs}, "results": {results}, '
+                       f'"version": {CALCULATION_VERSION}, "created": {created!r}, "last_used": {last_used!r}}}\n')
+        return len(rows)
+
+    def import_scenarios(self, file, chunk_size=10_000):
+        # # Reads an export_scenarios() file; keys are recomputed, so scenarios already stored are kept as they are,
+        # # and results exported by another calculation version are recalculated. Returns the number of new scenarios.
+        if isinstance(file, (str, os.PathLike)):
+            with open(file) as f:
+                return self.import_scenarios(f, chunk_size)
+        count = 0
+        rows = []
+        now = time.time()
+        for line in file:
+            if not line.strip():
+                continue
+            scenario = json.loads(line)
+            inputs = normalize_inputs(scenario["inputs"])
+            key = scenario_key(inputs)
+            results = scenario.get("results")
+            if not results or scenario.get("version") != CALCULATION_VERSION:
+                results = calculate_scenario(inputs)
+            rows.append(self._row(key, scenario.get("name") or key[:12], inputs, results,
+                                  scenario.get("created", now), scenario.get("last_used", now)))
+            if len(rows) >= chunk_size:
+                count += self._insert(rows, replace=False)
+                rows = []
+        if rows:
+            count += self._insert(rows, replace=False)
+        return count
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+def get_scenario_store():
+    # # The store at the default path, opened once per process and shared by every page and session
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ScenarioStore()
+        return _shared_store
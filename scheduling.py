@@ -0,0 +1,184 @@
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+from fleet import FLEET_DEFAULTS
+from hourly import HOURS_PER_DAY
+from operating_point import speed_study
+
+## Values used for any tank column missing from the tank data (volumes in m³)
+TANK_DEFAULTS = {
+    "min_volume": 0.0,
+    "max_volume": 1000.0,
+    "initial_volume": 500.0,
+}
+
+## Settings a scheduled pump can run at, as fractions of its rated speed; 0 (off) is always allowed
+SPEED_RATIOS = (1.0,)
+
+## Most on/off/speed combinations searched per tank (settings ** pumps on the tank)
+MAX_COMBINATIONS = 4096
+
+## Penalty (currency units per m³) for ending the day below the target volume
+SHORTFALL_PENALTY = 1e6
+
+INFEASIBLE = 1e15
+
+def _hourly(profile, pump_values, hours):
+    # # (pumps, hours) from one hourly profile shared by every pump, or else from each pump's own value
+    if profile is not None:
+        return np.broadcast_to(np.asarray(profile, dtype=np.float64), (len(pump_values), hours))
+    return np.broadcast_to(np.asarray(pump_values, dtype=np.float64)[:, None], (len(pump_values), hours))
+
+def _interpolate(values, volumes, min_volume, step):
+    # # Linear interpolation of the value function on its uniform volume grid. Outside the tank limits, or next to
+    # # an infeasible grid point it would otherwise be blended with, is infeasible.
+    position = (volumes - min_volume) / step if step > 0 else np.zeros_like(volumes)
+    inside = (position >= -1e-9) & (position <= len(values) - 1 + 1e-9)
+    position = np.clip(position, 0, len(values) - 1)
+    low = np.minimum(np.floor(position).astype(np.intp), len(values) - 2) if len(values) > 1 else np.zeros_like(position, dtype=np.intp)
+    share = position - low
+    share = np.where(share < 1e-9, 0.0, np.where(share > 1 - 1e-9, 1.0, share))  # # Snap onto grid points
+    high = np.minimum(low + 1, len(values) - 1)
+    interpolated = (1 - share) * values[low] + share * values[high]
+    blocked = ((values[low] >= INFEASIBLE) & (share < 1)) | ((values[high] >= INFEASIBLE) & (share > 0))
+    return np.where(inside & ~blocked, interpolated, INFEASIBLE)
+
+class PumpScheduler:
+    # # Dynamic programming over each tank's volume: every hour, every pump on the tank is off or at one of its
+    # # speed ratios. The operating points are solved once; solve_day() can then be called day after day, each
+    # # day starting from the previous day's end volumes and using its value function as the end-of-day value.
+    def __init__(self, pumps, tanks, speed_ratios=SPEED_RATIOS, levels=101):
+        self.pumps = pd.DataFrame(pumps).reset_index(drop=True)
+        tanks = pd.DataFrame(tanks)
+        self.tanks = tanks.set_index("tank") if "tank" in tanks else tanks
+        for name, default in TANK_DEFAULTS.items():
+            self.tanks[name] = self.tanks[name].fillna(default) if name in self.tanks else default
+        unknown = set(self.pumps["tank"]) - set(self.tanks.index)
+        if unknown:
+            raise ValueError(f"Pumps refer to unknown tanks: {sorted(map(str, unknown))}")
+
+        # # Flow and input power of every pump at every setting, from the pump-curve/system-curve intersection
+        settings = np.r_[0.0, np.asarray(speed_ratios, dtype=np.float64)]
+        study = speed_study(self.pumps, settings[1:])
+        shape = (len(self.pumps), len(settings) - 1)
+        feasible = study["feasible"].to_numpy().reshape(shape)
+        self.settings = settings
+        self.flow = np.c_[np.zeros(len(self.pumps)), np.where(feasible, study["operating_flow_rate"].to_numpy().reshape(shape), 0.0)]
+        self.power = np.c_[np.zeros(len(self.pumps)), np.where(feasible, study["input_power"].to_numpy().reshape(shape), 0.0)]
+
+        self.levels = levels
+        self._combinations = {}
+        for tank in self.tanks.index:
+            members = np.flatnonzero(self.pumps["tank"].to_numpy() == tank)
+            if len(settings) ** len(members) > MAX_COMBINATIONS:
+                raise ValueError(f"Tank {tank!r} has {len(members)} pumps with {len(settings)} settings each; "
+                                 f"use fewer speed ratios (at most {MAX_COMBINATIONS} combinations)")
+            choice = np.array(list(product(range(len(settings)), repeat=len(members))), dtype=np.intp).reshape(-1, len(members))
+            self._combinations[tank] = (members, choice)
+
+        self.reset()
+
+    def reset(self):
+        # # Forget previous days: start from the initial volumes, with a penalty for ending below them
+        self.end_volumes = self.tanks["initial_volume"].to_numpy(dtype=np.float64).copy()
+        self._end_values = {}
+
+    def state(self):
+        # # The warm start left by the last solve_day(), to restore() later
+        return self.end_volumes.copy(), dict(self._end_values)
+
+    def restore(self, state):
+        end_volumes, end_values = state
+        self.end_volumes = end_volumes.copy()
+        self._end_values = dict(end_values)
+
+    def _pump_column(self, name):
+        return self.pumps[name].to_numpy() if name in self.pumps else np.full(len(self.pumps), FLEET_DEFAULTS[name])
+
+    def _grid(self, tank):
+        row = self.tanks.loc[tank]
+        return row["min_volume"], row["max_volume"], np.linspace(row["min_volume"], row["max_volume"], self.levels)
+
+    def _solve_tank(self, tank, demand, price, initial_volume, target_volume):
+        members, choice = self._combinations[tank]
+        min_volume, max_volume, grid = self._grid(tank)
+        step = grid[1] - grid[0] if len(grid) > 1 else 0.0
+        hours = len(demand)
+
+        flow = self.flow[members[None, :], choice].sum(axis=1)  # # (combinations,)
+        energy = self.power[members[None, :], choice]  # # kWh in one hour, (combinations, pumps)
+        cost = energy @ price[members]  # # (combinations, hours)
+
+        # # End-of-day values: the previous day's value function when warm-starting, otherwise a penalty
+        # # for finishing below the target volume
+        if tank in self._end_values:
+            values = self._end_values[tank]
+        else:
+            values = SHORTFALL_PENALTY * np.maximum(target_volume - grid, 0.0)
+
+        policy_values = [None] * hours
+        for hour in reversed(range(hours)):
+            next_volumes = grid[:, None] + flow[None, :] - demand[hour]
+            total = cost[:, hour][None, :] + _interpolate(values, next_volumes, min_volume, step)
+            policy_values[hour] = values
+            values = np.minimum(total.min(axis=1), INFEASIBLE)
+        start_values = values
+
+        # # Forward pass from the actual volume, choosing the best combination at the exact (not gridded) volume
+        volumes = np.empty(hours + 1)
+        volumes[0] = initial_volume
+        chosen = np.empty(hours, dtype=np.intp)
+        for hour in range(hours):
+            next_volumes = volumes[hour] + flow - demand[hour]
+            total = cost[:, hour] + _interpolate(policy_values[hour], next_volumes, min_volume, step)
+            chosen[hour] = np.argmin(total)
+            if total[chosen[hour]] >= INFEASIBLE:
+                raise ValueError(f"Tank {tank!r} cannot meet its demand within its volume limits in hour {hour}")
+            volumes[hour + 1] = next_volumes[chosen[hour]]
+        return members, choice[chosen], volumes, start_values
+
+    def solve_day(self, demand, tariff=None, intensity=None, co2_weight=0.0, initial_volumes=None, target_volumes=None):
+        # # demand is m³/h per tank and hour, (tanks, hours); tariff and intensity are hourly profiles or None for
+        # # each pump's energy_cost and emission_factor. The objective is cost + co2_weight (currency/metric ton) x CO2.
+        demand = np.asarray(demand, dtype=np.float64)
+        hours = demand.shape[-1] if demand.ndim else HOURS_PER_DAY
+        demand = np.broadcast_to(demand, (len(self.tanks), hours))
+        size = len(self.pumps)
+
+        tariff = _hourly(tariff, self._pump_column("energy_cost"), hours)
+        intensity = _hourly(intensity, self._pump_column("emission_factor"), hours)
+        price = tariff + co2_weight * intensity
+
+        initial_volumes = self.end_volumes if initial_volumes is None else np.broadcast_to(
+            np.asarray(initial_volumes, dtype=np.float64), (len(self.tanks),))
+        target_volumes = self.tanks["initial_volume"].to_numpy(dtype=np.float64) if target_volumes is None else \
+            np.broadcast_to(np.asarray(target_volumes, dtype=np.float64), (len(self.tanks),))
+
+        setting_index = np.zeros((size, hours), dtype=np.intp)
+        volumes = np.empty((len(self.tanks), hours + 1))
+        end_values = {}
+        for t, tank in enumerate(self.tanks.index):
+            members, chosen, volumes[t], start_values = self._solve_tank(
+                tank, demand[t], price, initial_volumes[t], target_volumes[t])
+            setting_index[members] = chosen.T
+            end_values[tank] = start_values - start_values.min()  # # Only differences between volumes matter
+
+        # # Warm start for the next day
+        self._end_values = end_values
+        self.end_volumes = volumes[:, -1].copy()
+
+        rows = np.arange(size)[:, None]
+        energy = self.power[rows, setting_index]
+        hour_index = pd.RangeIndex(hours, name="hour")
+        return {
+            "settings": pd.DataFrame(self.settings[setting_index], index=self.pumps.index, columns=hour_index),
+            "flow": pd.DataFrame(self.flow[rows, setting_index], index=self.pumps.index, columns=hour_index),
+            "volumes": pd.DataFrame(volumes, index=self.tanks.index, columns=pd.RangeIndex(hours + 1, name="hour")),
+            "hourly": pd.DataFrame({
+                "energy_consumption": energy.sum(axis=0),
+                "energy_cost": (energy * tariff).sum(axis=0),
+                "co2_emissions": (energy * intensity).sum(axis=0),
+            }, index=hour_index),
+        }
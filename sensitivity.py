@@ -0,0 +1,171 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from math import prod
+
+import numpy as np
+import pandas as pd
+
+from fleet import calculate_fleet_arrays
+
+## Ranges of the sidebar inputs, used as the default parameter space
+SENSITIVITY_RANGES = {
+    "power_rating": (1.0, 500.0),
+    "operating_hours": (0.0, 24.0),
+    "pressure_boost": (0.0, 10.0),
+    "efficiency": (0.0, 100.0),
+    "leakage_rate": (0.0, 100.0),
+    "pipe_length": (1.0, 1000.0),
+    "pipe_diameter": (0.1, 5.0),
+    "flow_velocity": (0.1, 10.0),
+    "fluid_density": (500.0, 2000.0),
+    "fluid_viscosity": (0.001, 1.0),
+    "friction_loss_coefficient": (0.0, 1.0),
+    "static_head": (0.0, 100.0),
+    "dynamic_head": (0.0, 100.0),
+    "mechanical_efficiency": (0.0, 100.0),
+    "emission_factor": (0.0001, 0.001),
+    "energy_cost": (0.0, 10.0),
+    "maintenance_cost": (0.0, 10000.0),
+}
+
+def _evaluate(base_inputs, samples, output):
+    results = calculate_fleet_arrays({**base_inputs, **samples}, [output])
+    size = len(next(iter(samples.values())))
+    return np.broadcast_to(results[output], (size,))
+
+def _bounded_map(func, args, workers):
+    # # Like map(), but with a process pool and a bounded number of tasks in flight
+    if workers <= 1:
+        yield from (func(*arg) for arg in args)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for arg in args:
+            pending.append(pool.submit(func, *arg))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def grid_size(grid):
+    return prod(len(levels) for levels in grid.values())
+
+def _grid_index(grid, start, stop):
+    shape = tuple(len(levels) for levels in grid.values())
+    return np.unravel_index(np.arange(start, stop), shape)
+
+def grid_points(grid, start, stop, index=None):
+    # # Decode a range of flat indices into parameter values, so the grid is never built in full
+    index = _grid_index(grid, start, stop) if index is None else index
+    return {name: np.asarray(levels, dtype=np.float64)[i] for (name, levels), i in zip(grid.items(), index)}
+
+def _sweep_chunk(base_inputs, grid, start, stop, outputs):
+    points = grid_points(grid, start, stop)
+    results = calculate_fleet_arrays({**base_inputs, **points}, outputs)
+    size = stop - start
+    columns = dict(points)
+    columns.update({name: np.broadcast_to(results[name], (size,)) for name in outputs})
+    return pd.DataFrame(columns, index=pd.RangeIndex(start, stop))
+
+def sweep(base_inputs, grid, outputs=("total_co2_emissions",), chunk_size=1_000_000, workers=1):
+    # # Full-factorial sweep, yielded in order one chunk at a time
+    total = grid_size(grid)
+    args = ((base_inputs, grid, start, min(start + chunk_size, total), list(outputs))
+            for start in range(0, total, chunk_size))
+    yield from _bounded_map(_sweep_chunk, args, workers)
+
+def _main_effect_chunk(base_inputs, grid, start, stop, output):
+    index = _grid_index(grid, start, stop)
+    values = _evaluate(base_inputs, grid_points(grid, start, stop, index), output)
+    sums = [np.bincount(i, weights=values, minlength=len(levels)) for i, levels in zip(index, grid.values())]
+    counts = [np.bincount(i, minlength=len(levels)) for i, levels in zip(index, grid.values())]
+    return sums, counts, values.min(), values.max()
+
+def main_effects(base_inputs, grid, output="total_co2_emissions", chunk_size=1_000_000, workers=1):
+    # # Mean output at each level of each parameter over the full grid, reduced chunk by chunk
+    total = grid_size(grid)
+    args = ((base_inputs, grid, start, min(start + chunk_size, total), output)
+            for start in range(0, total, chunk_size))
+    sums = [np.zeros(len(levels)) for levels in grid.values()]
+    counts = [np.zeros(len(levels)) for levels in grid.values()]
+    low, high = np.inf, -np.inf
+    for chunk_sums, chunk_counts, chunk_low, chunk_high in _bounded_map(_main_effect_chunk, args, workers):
+        for i in range(len(sums)):
+            sums[i] += chunk_sums[i]
+            counts[i] += chunk_counts[i]
+        low, high = min(low, chunk_low), max(high, chunk_high)
+
+    effects = {name: pd.Series(s / c, index=pd.Index(levels, name=name), name=output)
+               for (name, levels), s, c in zip(grid.items(), sums, counts)}
+    return effects, (low, high)
+
+def tornado(base_inputs, ranges, output="total_co2_emissions"):
+    # # One-at-a-time: the change in output when each parameter moves to the low and high end of its range
+    names = list(ranges)
+    rows = len(names) * 2 + 1
+    samples = {name: np.full(rows, float(base_inputs.get(name, np.mean(ranges[name])))) for name in names}
+    for i, name in enumerate(names):
+        samples[name][2 * i + 1], samples[name][2 * i + 2] = ranges[name]
+    values = _evaluate(base_inputs, samples, output)
+    return pd.DataFrame({
+        "Low": values[1::2] - values[0],
+        "High": values[2::2] - values[0],
+    }, index=pd.Index(names, name="Parameter"))
+
+def _scale(unit_samples, ranges):
+    low = np.array([r[0] for r in ranges.values()])
+    high = np.array([r[1] for r in ranges.values()])
+    return low + unit_samples * (high - low)
+
+def _columns(matrix, ranges):
+    return {name: matrix[:, j] for j, name in enumerate(ranges)}
+
+def sobol_indices(base_inputs, ranges, output="total_co2_emissions", n_samples=8192, seed=None, workers=1):
+    # # Saltelli sampling with the Saltelli (2010) first-order and Jansen total-order estimators
+    rng = np.random.default_rng(seed)
+    k = len(ranges)
+    a = _scale(rng.random((n_samples, k)), ranges)
+    b = _scale(rng.random((n_samples, k)), ranges)
+    f_a = _evaluate(base_inputs, _columns(a, ranges), output)
+    f_b = _evaluate(base_inputs, _columns(b, ranges), output)
+    variance = np.var(np.concatenate([f_a, f_b]))
+
+    def ab_matrix(i):
+        ab = a.copy()
+        ab[:, i] = b[:, i]
+        return _columns(ab, ranges)
+
+    args = ((base_inputs, ab_matrix(i), output) for i in range(k))
+    first, total = [], []
+    for f_ab in _bounded_map(_evaluate, args, workers):
+        first.append(np.mean(f_b * (f_ab - f_a)) / variance if variance > 0 else 0.0)
+        total.append(0.5 * np.mean((f_a - f_ab) ** 2) / variance if variance > 0 else 0.0)
+    return pd.DataFrame({"S1": first, "ST": total}, index=pd.Index(list(ranges), name="Parameter"))
+
+def morris_effects(base_inputs, ranges, output="total_co2_emissions", trajectories=100, levels=4, seed=None):
+    # # Elementary effects over random one-at-a-time trajectories on a levels-point grid
+    rng = np.random.default_rng(seed)
+    k = len(ranges)
+    delta = levels / (2 * (levels - 1))
+    start = rng.integers(0, levels // 2, (trajectories, k)) / (levels - 1)  # # start + delta stays within [0, 1]
+    order = np.argsort(rng.random((trajectories, k)), axis=1)
+
+    # # Point j of each trajectory has the first j parameters (in its random order) moved by delta
+    steps = np.zeros((trajectories, k + 1, k))
+    for j in range(k):
+        rows = np.arange(trajectories)
+        steps[rows, j + 1:, order[:, j]] = 1.0
+    points = start[:, None, :] + steps * delta
+
+    values = _evaluate(base_inputs, _columns(_scale(points.reshape(-1, k), ranges), ranges), output)
+    values = values.reshape(trajectories, k + 1)
+    effects = np.empty((trajectories, k))
+    rows = np.arange(trajectories)
+    for j in range(k):
+        effects[rows, order[:, j]] = (values[:, j + 1] - values[:, j]) / delta
+
+    return pd.DataFrame({
+        "mu_star": np.abs(effects).mean(axis=0),
+        "mu": effects.mean(axis=0),
+        "sigma": effects.std(axis=0),
+    }, index=pd.Index(list(ranges), name="Parameter"))
@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import json
+import sys
+from http import HTTPStatus
+
+import numpy as np
+
+from calculations import PIPE_ROUGHNESS
+from fleet import FLEET_DEFAULTS, FLEET_RESULT_COLUMNS, TEXT_COLUMNS, calculate_fleet_arrays
+
+## Micro-batching: requests arriving within MAX_DELAY seconds of each other share one vectorized calculation
+MAX_BATCH_ROWS = 8192
+MAX_DELAY = 0.002
+
+## Backpressure: new requests get 503 once this many pumps are waiting to be calculated
+MAX_PENDING_ROWS = 100_000
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+## Numeric fields only have to be finite, except these, which the calculations divide by, and the
+## efficiencies, which only scale results and may be anything from 0 to 100 (%)
+POSITIVE_FIELDS = {"pipe_diameter", "fluid_density", "fluid_viscosity"}
+PERCENT_FIELDS = {"efficiency", "mechanical_efficiency"}
+
+class Overloaded(Exception):
+    pass
+
+def validate_pumps(records):
+    # # Checked per request, so one bad pump is a 400 for its own request rather than a failed batch
+    if not isinstance(records, list) or not records:
+        raise ValueError("Expected a pump object or a non-empty list of pump objects")
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            raise ValueError(f"Pump {i} is not an object")
+        for name, value in record.items():
+            if name not in FLEET_DEFAULTS:
+                raise ValueError(f"Pump {i} has unknown field {name!r}")
+            if name in TEXT_COLUMNS:
+                if not isinstance(value, str):
+                    raise ValueError(f"Pump {i}: {name!r} must be a string")
+            elif not isinstance(value, (int, float)) or isinstance(value, bool):
+                raise ValueError(f"Pump {i}: {name!r} must be a number")
+            elif not abs(value) <= sys.float_info.max:  # # Also false for NaN and for ints too large for a float
+                raise ValueError(f"Pump {i}: {name!r} must be finite")
+            elif name in POSITIVE_FIELDS and value <= 0:
+                raise ValueError(f"Pump {i}: {name!r} must be greater than 0")
+            elif name in PERCENT_FIELDS and not 0 <= value <= 100:
+                raise ValueError(f"Pump {i}: {name!r} must be between 0 and 100 (%)")
+        if record.get("pipe_material", FLEET_DEFAULTS["pipe_material"]) not in PIPE_ROUGHNESS:
+            raise ValueError(f"Pump {i}: unknown pipe material {record['pipe_material']!r}, "
+                             f"expected one of {list(PIPE_ROUGHNESS)}")
+    return records
+
+def pump_columns(records):
+    # # One array per input across every pump in the batch; missing fields fall back to FLEET_DEFAULTS
+    columns = {}
+    for name, default in FLEET_DEFAULTS.items():
+        values = [record.get(name, default) for record in records]
+        columns[name] = np.array(values, dtype=str if name in TEXT_COLUMNS else np.float64)
+    return columns
+
+def batch_values(records):
+    # # Results of a batch as one list per output, in the order of records
+    results = calculate_fleet_arrays(pump_columns(records))
+    return {name: np.broadcast_to(results[name], (len(records),)).tolist() for name in FLEET_RESULT_COLUMNS}
+
+def encode_response(status, payload):
+    # # Strict JSON: a non-finite result is a server error rather than an Infinity or NaN in the body
+    try:
+        return status, json.dumps(payload, allow_nan=False).encode()
+    except ValueError:
+        return HTTPStatus.INTERNAL_SERVER_ERROR, json.dumps({"error": "The result is not a finite number"}).encode()
+
+class MicroBatcher:
+    # # Queues validated pump lists and calculates each group of them with one calculate_fleet_arrays() call
+    def __init__(self, max_batch_rows=MAX_BATCH_ROWS, max_delay=MAX_DELAY, max_pending_rows=MAX_PENDING_ROWS):
+        self.max_batch_rows = max_batch_rows
+        self.max_delay = max_delay
+        self.max_pending_rows = max_pending_rows
+        self.pending_rows = 0
+        self.batches = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, records):
+        size = len(records)
+        if self.pending_rows + size > self.max_pending_rows and self.pending_rows > 0:
+            raise Overloaded(f"{self.pending_rows} pumps already waiting")
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self.pending_rows += size
+        self._queue.put_nowait((records, size, future))
+        return await future
+
+    def _drain(self, batch, rows):
+        while rows < self.max_batch_rows and not self._queue.empty():
+            item = self._queue.get_nowait()
+            batch.append(item)
+            rows += item[1]
+        return rows
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            rows = self._drain(batch, batch[0][1])
+            # # Wait (at most once) for the rest of the window unless the batch is already full
+            if rows < self.max_batch_rows and loop.time() < deadline:
+                await asyncio.sleep(deadline - loop.time())
+                rows = self._drain(batch, rows)
+            await self._calculate(batch, rows)
+
+    async def _calculate(self, batch, rows):
+        self.pending_rows -= rows
+        self.batches += 1
+        records = [record for item in batch for record in item[0]]
+        try:
+            # # In a worker thread, so the event loop keeps accepting and parsing requests meanwhile
+            values = await asyncio.get_running_loop().run_in_executor(None, batch_values, records)
+        except asyncio.CancelledError:
+            for _, _, future in batch:
+                future.cancel()
+            raise
+        except Exception as error:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        start = 0
+        for _, size, future in batch:
+            if not future.done():  # # The client may have gone away
+                future.set_result([{name: values[name][i] for name in FLEET_RESULT_COLUMNS}
+                                   for i in range(start, start + size)])
+            start += size
+
+class CalculationService:
+    # # POST /calculate takes one pump object, POST /calculate/bulk a list (or {"pumps": [...]}); GET /health
+    def __init__(self, max_batch_rows=MAX_BATCH_ROWS, max_delay=MAX_DELAY, max_pending_rows=MAX_PENDING_ROWS,
+                 max_body_bytes=MAX_BODY_BYTES):
+        self.batcher = MicroBatcher(max_batch_rows, max_delay, max_pending_rows)
+        self.max_body_bytes = max_body_bytes
+
+    async def calculate(self, records):
+        return await self.batcher.submit(validate_pumps(records))
+
+    async def handle(self, method, path, body=b""):
+        path = path.split("?", 1)[0].rstrip("/")
+        if path == "/health":
+            if method != "GET":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use GET"}
+            return HTTPStatus.OK, {"status": "ok", "pending_rows": self.batcher.pending_rows,
+                                   "batches": self.batcher.batches}
+        if path not in ("/calculate", "/calculate/bulk"):
+            return HTTPStatus.NOT_FOUND, {"error": f"No endpoint {path!r}"}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Use POST"}
+
+        try:
+            data = json.loads(body)
+            if path == "/calculate":
+                if not isinstance(data, dict):
+                    raise ValueError("Expected a pump object")
+                return HTTPStatus.OK, (await self.calculate([data]))[0]
+            if isinstance(data, dict):
+                data = data.get("pumps")
+            return HTTPStatus.OK, {"results": await self.calculate(data)}
+        except ValueError as error:  # # Includes invalid JSON
+            return HTTPStatus.BAD_REQUEST, {"error": str(error)}
+        except Overloaded as error:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": f"Overloaded: {error}"}
+        except Exception as error:  # # E.g. a failed batch calculation; the client still gets a response
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"Calculation failed: {error}"}
+
+    async def _handle_connection(self, reader, writer):
+        # # Minimal HTTP/1.1 with keep-alive, enough for JSON clients and load balancers
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                if length > self.max_body_bytes:
+                    status, payload = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    status, payload = await self.handle(method, path, body)
+
+                status, content = encode_response(status, payload)
+                head = [f"HTTP/1.1 {status.value} {status.phrase}", "Content-Type: application/json",
+                        f"Content-Length: {len(content)}"]
+                if status == HTTPStatus.SERVICE_UNAVAILABLE:
+                    head.append("Retry-After: 1")
+                if not keep_alive:
+                    head.append("Connection: close")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + content)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # # Client went away or sent a malformed request
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        self.batcher.start()
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def close(self):
+        await self.batcher.stop()
+
+class LocalClient:
+    # # In-process client: same handler, JSON round-trip and status codes as over HTTP, without a socket
+    def __init__(self, service=None):
+        self.service = service or CalculationService()
+
+    async def request(self, method, path, data=None):
+        body = b"" if data is None else json.dumps(data).encode()
+        status, content = encode_response(*await self.service.handle(method, path, body))
+        return status.value, json.loads(content)
+
+    async def get(self, path):
+        return await self.request("GET", path)
+
+    async def post(self, path, data):
+        return await self.request("POST", path, data)
+
+async def _serve_forever(service, host, port):
+    server = await service.serve(host, port)
+    print(f"Serving on http://{host}:{port}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP service for the pump energy, CO2 and cost calculations.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on (default: 8000).")
+    parser.add_argument("--max-batch-rows", type=int, default=MAX_BATCH_ROWS,
+                        help=f"Most pumps calculated in one batch (default: {MAX_BATCH_ROWS}).")
+    parser.add_argument("--max-delay", type=float, default=MAX_DELAY * 1000,
+                        help=f"Milliseconds to wait for more requests to batch (default: {MAX_DELAY * 1000:g}).")
+    parser.add_argument("--max-pending-rows", type=int, default=MAX_PENDING_ROWS,
+                        help=f"Queued pumps before new requests get 503 (default: {MAX_PENDING_ROWS}).")
+    args = parser.parse_args(argv)
+
+    service = CalculationService(args.max_batch_rows, args.max_delay / 1000, args.max_pending_rows)
+    try:
+        asyncio.run(_serve_forever(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
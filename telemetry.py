@@ -0,0 +1,277 @@
+import argparse
+import glob
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from calculations import calculate_co2_emissions, calculate_head_loss, calculate_useful_energy
+from fleet import FLEET_DEFAULTS, calculate_fleet
+
+## Telemetry columns: timestamp (ISO 8601 or Unix seconds), pump id, electrical power (kW) and flow (m³/h).
+## An optional head column (m) is used instead of each pump's static + dynamic head.
+TELEMETRY_COLUMNS = ["timestamp", "pump", "power", "flow"]
+
+## Intervals longer than this (seconds) are logging gaps and are not integrated
+MAX_SAMPLE_GAP = 300.0
+
+## Bytes read from a log file at a time; only complete lines are parsed, a partial last line waits for the next read
+READ_BLOCK_BYTES = 64 * 1024 * 1024
+
+## Power (kW) above which a pump counts as running
+RUNNING_POWER = 0.1
+
+GRAVITY = 9.81
+
+## Additive per-window sums; efficiency, CO2 and cost are derived from them when the results are read
+WINDOW_SUMS = ["energy_consumption", "hydraulic_energy", "pumped_volume", "run_hours", "samples"]
+
+NS_PER_HOUR = 3600 * 10**9
+
+def iter_blocks(path, offset=0, block_bytes=READ_BLOCK_BYTES):
+    # # Complete lines from offset on, a block at a time, each with the file offset just after it
+    with open(path, "rb") as handle:
+        handle.seek(offset)
+        tail = b""
+        while True:
+            data = handle.read(block_bytes)
+            if not data:
+                return
+            data = tail + data
+            end = data.rfind(b"\n") + 1
+            tail = data[end:]
+            if end:
+                offset += end
+                yield data[:end], offset
+
+def parse_timestamps(values):
+    # # Unix seconds or date strings, as UTC without a time zone
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_datetime(values, unit="s").astype("datetime64[ns]")
+    return pd.to_datetime(values, utc=True, format="ISO8601").dt.tz_localize(None).astype("datetime64[ns]")
+
+class TelemetryIngestor:
+    # # Streams SCADA logs into per-pump, per-window sums. Every file is read from where the last ingest()
+    # # stopped, and each pump's last sample is kept so intervals spanning two reads or two log segments
+    # # are still integrated; nothing already ingested is read or recomputed again.
+    def __init__(self, pumps=None, window="1h", max_gap=MAX_SAMPLE_GAP, block_bytes=READ_BLOCK_BYTES):
+        self.pumps = pd.DataFrame(pumps) if pumps is not None else pd.DataFrame()
+        if "pump" in self.pumps:
+            self.pumps = self.pumps.set_index("pump")
+        self.pumps.index = self.pumps.index.astype(str)
+        self.window = pd.Timedelta(window)
+        self.max_gap = pd.Timedelta(seconds=max_gap)
+        self.block_bytes = block_bytes
+
+        self.files = {}  # # path -> (offset, header columns)
+        self.last = pd.DataFrame({
+            "first": pd.Series(dtype="datetime64[ns]"),
+            "timestamp": pd.Series(dtype="datetime64[ns]"),
+            "power": pd.Series(dtype=np.float64),
+            "flow": pd.Series(dtype=np.float64),
+        })
+        self.rows = 0
+        self.bytes_read = 0
+        self._windows = pd.DataFrame(columns=WINDOW_SUMS, dtype=np.float64,
+                                     index=pd.MultiIndex.from_arrays([[], []], names=["pump", "window"]))
+        self._parts = []
+
+    def _pump_values(self, name, pumps):
+        if name in self.pumps:
+            return self.pumps[name].reindex(pumps).fillna(FLEET_DEFAULTS[name]).to_numpy(dtype=np.float64)
+        return np.full(len(pumps), FLEET_DEFAULTS[name])
+
+    def _head(self, pumps):
+        return calculate_head_loss(self._pump_values("static_head", pumps), self._pump_values("dynamic_head", pumps))
+
+    def ingest_frame(self, frame):
+        # # Add parsed samples (TELEMETRY_COLUMNS, optionally head); returns the number of samples
+        missing = set(TELEMETRY_COLUMNS) - set(frame.columns)
+        if missing:
+            raise ValueError(f"Telemetry is missing columns {sorted(missing)}, expected {TELEMETRY_COLUMNS}")
+        if frame.empty:
+            return 0
+        frame = pd.DataFrame({
+            "timestamp": parse_timestamps(frame["timestamp"]).to_numpy(),
+            "pump": frame["pump"].astype(str).to_numpy(),
+            "power": frame["power"].to_numpy(dtype=np.float64),
+            "flow": frame["flow"].to_numpy(dtype=np.float64),
+            "head": frame["head"].to_numpy(dtype=np.float64) if "head" in frame else np.nan,
+        }).sort_values(["pump", "timestamp"], kind="stable")
+
+        pump = frame["pump"].to_numpy()
+        time = frame["timestamp"].to_numpy()
+        power = frame["power"].to_numpy()
+        flow = frame["flow"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, pump[1:] != pump[:-1]])
+        ends = np.r_[starts[1:], len(pump)] - 1
+        ids = pump[starts]
+
+        # # Each sample closes the interval since the pump's previous sample, which for the first sample of
+        # # a pump here is the last one from earlier reads
+        previous = self.last.reindex(ids)
+        previous_time = np.r_[time[:1], time[:-1]]
+        previous_power = np.r_[power[:1], power[:-1]]
+        previous_flow = np.r_[flow[:1], flow[:-1]]
+        previous_time[starts] = previous["timestamp"].to_numpy()
+        previous_power[starts] = previous["power"].to_numpy()
+        previous_flow[starts] = previous["flow"].to_numpy()
+        gap = time - previous_time
+        valid = ~np.isnat(previous_time) & (gap > np.timedelta64(0)) & (gap <= self.max_gap.to_timedelta64())
+        end = time.astype(np.int64)
+        start = np.where(valid, previous_time.astype(np.int64), end)
+        length = np.where(valid, end - start, 1)
+
+        # # An interval crossing window boundaries is split into one segment per window it covers; the
+        # # sample itself is counted in the window of its own timestamp
+        width = self.window.value
+        first_window, last_window = start // width, end // width
+        counts = last_window - first_window + 1
+        interval = np.repeat(np.arange(len(end)), counts)
+        step = np.arange(len(interval)) - np.repeat(np.cumsum(counts) - counts, counts)
+        window_number = first_window[interval] + step
+        segment_start = np.maximum(start[interval], window_number * width)
+        segment_end = np.minimum(end[interval], (window_number + 1) * width)
+        hours = (segment_end - segment_start) / NS_PER_HOUR
+
+        # # Trapezoidal integration of power (kW) and flow (m³/h), linear between samples, over each segment
+        position = ((segment_start + segment_end) / 2 - start[interval]) / length[interval]
+        integrated = valid[interval]
+        energy = np.where(integrated, previous_power[interval] + (power - previous_power)[interval] * position, 0.0) * hours
+        volume = np.where(integrated, previous_flow[interval] + (flow - previous_flow)[interval] * position, 0.0) * hours
+        mean_power = np.where(valid, (power + previous_power) / 2, 0.0)
+        positions = np.repeat(np.arange(len(ids)), ends - starts + 1)
+        head = frame["head"].to_numpy()
+        head = np.where(np.isnan(head), self._head(ids)[positions], head)
+        density = self._pump_values("fluid_density", ids)[positions]
+        hydraulic_energy = density[interval] * GRAVITY * volume * head[interval] / 3.6e6  # # kWh
+
+        sums = pd.DataFrame({
+            "pump": pump[interval],
+            "window": (window_number * width).astype("datetime64[ns]"),
+            "energy_consumption": energy,
+            "hydraulic_energy": hydraulic_energy,
+            "pumped_volume": volume,
+            "run_hours": np.where(mean_power[interval] > RUNNING_POWER, hours, 0.0),
+            "samples": (window_number == last_window[interval]).astype(np.float64),
+        })
+        self._parts.append(sums.groupby(["pump", "window"], sort=False).sum())
+        if len(self._parts) >= 64:
+            self._merge()
+
+        # # Keep the latest sample of every pump; out-of-order samples older than it are not integrated
+        latest = pd.DataFrame({
+            "first": previous["first"].fillna(pd.Series(time[starts], index=ids)).to_numpy(),
+            "timestamp": time[ends],
+            "power": power[ends],
+            "flow": flow[ends],
+        }, index=ids)
+        newer = previous["timestamp"].isna().to_numpy() | (time[ends] > previous["timestamp"].to_numpy())
+        latest = latest[newer]
+        self.last = pd.concat([self.last.drop(latest.index, errors="ignore"), latest])
+        self.rows += len(frame)
+        return len(frame)
+
+    def ingest(self, path):
+        # # Read the part of a log file not ingested yet; returns the number of samples
+        offset, columns = self.files.get(path, (0, None))
+        if os.path.getsize(path) < offset:
+            offset, columns = 0, None  # # Replaced or truncated: a new file under the same name
+        rows = 0
+        for block, end in iter_blocks(path, offset, self.block_bytes):
+            if columns is None:
+                header, _, block = block.partition(b"\n")
+                columns = pd.read_csv(io.BytesIO(header + b"\n")).columns.tolist()
+            if block:
+                rows += self.ingest_frame(pd.read_csv(io.BytesIO(block), header=None, names=columns,
+                                                      dtype={"pump": str}))
+            self.bytes_read += end - offset
+            offset = end
+            self.files[path] = (offset, columns)
+        return rows
+
+    def ingest_directory(self, directory, pattern="*.csv"):
+        # # Ingest every log segment in name order; segments already read only cost a size check
+        return sum(self.ingest(path) for path in sorted(glob.glob(os.path.join(directory, pattern))))
+
+    def _merge(self):
+        if self._parts:
+            merged = pd.concat([self._windows, *self._parts]) if len(self._windows) else pd.concat(self._parts)
+            self._windows = merged.groupby(level=["pump", "window"]).sum()
+            self._parts = []
+
+    def _derive(self, sums, pumps):
+        # # Effective efficiency is measured hydraulic over electrical energy; CO2 and cost are those of the
+        # # metered electrical energy
+        energy = sums["energy_consumption"].to_numpy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            efficiency = np.where(energy > 0, sums["hydraulic_energy"].to_numpy() / energy * 100, np.nan)
+        return sums.assign(
+            effective_efficiency=efficiency,
+            useful_energy=calculate_useful_energy(energy, np.nan_to_num(efficiency)),
+            co2_emissions=calculate_co2_emissions(energy, self._pump_values("emission_factor", pumps)),
+            energy_cost=self._pump_values("energy_cost", pumps) * energy,
+        )
+
+    def windows(self):
+        # # Per-pump, per-window results, indexed by (pump, window start)
+        self._merge()
+        return self._derive(self._windows, self._windows.index.get_level_values("pump"))
+
+    def totals(self):
+        # # Per-pump results over everything ingested, with the energy calculate_fleet() estimates for the
+        # # same days from power_rating and operating_hours when the pump data has them
+        self._merge()
+        sums = self._windows.groupby(level="pump").sum()
+        totals = self._derive(sums, sums.index)
+        span = self.last.reindex(sums.index)
+        totals["days"] = (span["timestamp"] - span["first"]).dt.total_seconds().to_numpy() / 86400
+        if "power_rating" in self.pumps:
+            estimated = calculate_fleet(self.pumps.reindex(sums.index).dropna(axis=1, how="all"))
+            totals["estimated_energy_consumption"] = estimated["energy_consumption"].to_numpy() * totals["days"]
+        return totals
+
+    def save(self, path):
+        # # Offsets, last samples and sums, so a later run only reads what was appended since
+        self._merge()
+        pd.to_pickle(self.__dict__, path)
+
+    @classmethod
+    def load(cls, path):
+        ingestor = cls.__new__(cls)
+        ingestor.__dict__.update(pd.read_pickle(path))
+        return ingestor
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest SCADA power and flow logs into metered energy, efficiency and CO2.")
+    parser.add_argument("paths", nargs="+", help="Log files or directories of *.csv log segments.")
+    parser.add_argument("--pumps", help="CSV of pump data (pump id plus fleet columns such as emission_factor).")
+    parser.add_argument("--window", default="1h", help="Aggregation window, e.g. 15min, 1h, 1D (default: 1h).")
+    parser.add_argument("--max-gap", type=float, default=MAX_SAMPLE_GAP,
+                        help=f"Seconds between samples beyond which nothing is integrated (default: {MAX_SAMPLE_GAP:g}).")
+    parser.add_argument("--state", help="State file; if it exists, only data appended since the last run is read.")
+    parser.add_argument("--output", help="Write the per-window results to this CSV file.")
+    args = parser.parse_args(argv)
+
+    if args.state and os.path.exists(args.state):
+        ingestor = TelemetryIngestor.load(args.state)
+    else:
+        pumps = pd.read_csv(args.pumps, dtype={"pump": str}) if args.pumps else None
+        ingestor = TelemetryIngestor(pumps, args.window, args.max_gap)
+
+    rows = 0
+    for path in args.paths:
+        rows += ingestor.ingest_directory(path) if os.path.isdir(path) else ingestor.ingest(path)
+    print(f"Ingested {rows:,} new samples ({ingestor.rows:,} in total)", file=sys.stderr)
+
+    if args.state:
+        ingestor.save(args.state)
+    if args.output:
+        ingestor.windows().to_csv(args.output)
+    print(ingestor.totals().round(4).to_string())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
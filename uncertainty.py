@@ -0,0 +1,100 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from fleet import calculate_fleet_arrays
+from graph import CALCULATION_NODES, graph_structure
+
+DISTRIBUTIONS = ["fixed", "normal", "uniform", "triangular", "lognormal"]
+
+## Physical limits samples are clipped to; any other input is clipped at zero
+INPUT_BOUNDS = {
+    "operating_hours": (0.0, 24.0),
+    "efficiency": (0.0, 100.0),
+    "leakage_rate": (0.0, 100.0),
+    "mechanical_efficiency": (0.0, 100.0),
+}
+
+## Monte Carlo outputs and the calculation result each one is taken from
+MONTE_CARLO_OUTPUTS = {
+    "daily_co2": "total_co2_emissions",
+    "annual_co2": "total_co2_emissions",
+    "annual_cost": "total_cost",
+    "friction_loss": "friction_loss",
+}
+
+_, _DOWNSTREAM = graph_structure(CALCULATION_NODES)
+
+def affected_outputs(distributions):
+    # # The outputs some sampled input feeds into; every other output is the same in all samples
+    affected = set().union(*(_DOWNSTREAM.get(name, frozenset()) for name in distributions))
+    return [name for name, result in MONTE_CARLO_OUTPUTS.items() if result in affected]
+
+def draw_samples(spec, size, rng, name=None):
+    # # spec is a plain value or a tuple such as ("normal", mean, std), ("uniform", low, high),
+    # # ("triangular", low, mode, high) or ("lognormal", median, sigma)
+    if not isinstance(spec, (tuple, list)):
+        return np.full(size, float(spec))
+    kind, *params = spec
+    if kind == "fixed":
+        samples = np.full(size, float(params[0]))
+    elif kind == "normal":
+        samples = rng.normal(params[0], params[1], size)
+    elif kind == "uniform":
+        samples = rng.uniform(params[0], params[1], size)
+    elif kind == "triangular":
+        samples = rng.triangular(params[0], params[1], params[2], size)
+    elif kind == "lognormal":
+        samples = rng.lognormal(np.log(params[0]), params[1], size)
+    else:
+        raise ValueError(f"Unknown distribution {kind!r}, expected one of {DISTRIBUTIONS}")
+
+    low, high = INPUT_BOUNDS.get(name, (0.0, None))
+    return np.clip(samples, low, high)
+
+def _simulate_block(inputs, distributions, size, seed, outputs):
+    rng = np.random.default_rng(seed)
+    columns = dict(inputs)
+    for name, spec in distributions.items():
+        columns[name] = draw_samples(spec, size, rng, name)
+
+    results = calculate_fleet_arrays(columns, sorted({MONTE_CARLO_OUTPUTS[name] for name in outputs}))
+    block = {name: np.broadcast_to(results[MONTE_CARLO_OUTPUTS[name]], (size,)) for name in outputs}
+    if "annual_co2" in block:
+        block["annual_co2"] = block["annual_co2"] * 365
+    return block
+
+def run_monte_carlo(inputs, distributions, n_samples, seed=None, block_size=250_000, workers=1, outputs=None):
+    # # Each block gets its own child seed, so results depend only on the seed and block size,
+    # # not on the number of workers. By default only the outputs the sampled inputs affect are simulated.
+    outputs = affected_outputs(distributions) if outputs is None else list(outputs)
+    unknown = set(outputs) - set(MONTE_CARLO_OUTPUTS)
+    if unknown:
+        raise ValueError(f"Unknown outputs {sorted(unknown)}, expected some of {list(MONTE_CARLO_OUTPUTS)}")
+    starts = range(0, n_samples, block_size)
+    sizes = [min(block_size, n_samples - start) for start in starts]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = ([inputs] * len(sizes), [distributions] * len(sizes), sizes, seeds, [outputs] * len(sizes))
+
+    results = {name: np.empty(n_samples) for name in outputs}
+
+    def collect(blocks):
+        for start, size, block in zip(starts, sizes, blocks):
+            for name in outputs:
+                results[name][start:start + size] = block[name]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            collect(pool.map(_simulate_block, *args))
+    else:
+        collect(map(_simulate_block, *args))
+    return results
+
+def summarize(results, percentiles=(5, 25, 50, 75, 95)):
+    rows = {}
+    for name, values in results.items():
+        row = {"mean": values.mean(), "std": values.std()}
+        row.update({f"p{p}": v for p, v in zip(percentiles, np.percentile(values, percentiles))})
+        rows[name] = row
+    return pd.DataFrame(rows).T